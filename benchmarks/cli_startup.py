@@ -0,0 +1,67 @@
+"""measure cold cli startup time against the number of registered commands
+
+usage: python benchmarks/cli_startup.py [counts ...]
+"""
+import os, sys, time, tempfile, statistics
+from stakk import cli_handler, meta_handler, spec_handler
+
+
+def make_func(i):
+    """build a command with a typical signature"""
+    def command(name: str, count: int = 1, mode: ['fast', 'slow'] = 'fast', tags: list = None) -> str:
+        '''synthetic command'''
+        return name * count
+
+    command.__name__ = f'command_{i}'
+    return command
+
+
+def build(funcs, eager=False, cache=None):
+    """register, introspect and build the cli on a fresh stack, then parse one command like a real invocation
+
+    :param eager: build every subparser, as before lazy construction
+    :param cache: spec cache file, loaded from disk like a fresh process would
+    """
+    stack = meta_handler.Stack()
+    cli_obj = cli_handler.CLI('benchmark cli')
+    if cache is not None:
+        stack.specs = cli_obj.specs = spec_handler.SpecCache(cache)
+    for func in funcs:
+        stack.add_func('bench', func)
+
+    # commands are introspected, or read from the spec cache, on the first get_stack
+    cli_obj.add_funcs(stack.get_stack('bench'))
+    if cache is not None:
+        stack.specs.save()
+    if eager:
+        for name in cli_obj.subparsers.choices:
+            cli_obj.subparsers.choices[name]
+    cli_obj.parser.parse_args(['command_0', 'foo', '--count', '2'])
+
+
+def measure(func, repeat=5):
+    """median duration of repeated cold builds in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start_time) * 1e3)
+    return statistics.median(timings)
+
+
+def main(counts):
+    print(f"{'commands':>8} {'eager ms':>10} {'lazy ms':>10} {'cached ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            funcs = [make_func(i) for i in range(count)]
+            cache = os.path.join(directory, f'{count}.stakk.json')
+            build(funcs, cache=cache)  # write the spec cache once
+
+            eager = measure(lambda: build(funcs, eager=True))
+            lazy = measure(lambda: build(funcs))
+            cached = measure(lambda: build(funcs, cache=cache))
+            print(f"{count:>8} {eager:>10.2f} {lazy:>10.2f} {cached:>10.2f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10, 50, 100, 200, 400, 800])
@@ -1,32 +1,78 @@
-from stakk import cli_handler, meta_handler, bench_handler
+__version__ = '0.1.0'
+
+import os, sys
+from stakk import cli_handler, meta_handler, bench_handler, runner_handler, spec_handler
 
 # init stack
 stack = meta_handler.Stack()
 benchy = bench_handler.Benchy()
 
 
-def register(stack_id: str):
+def register(stack_id: str, executor: str = None):
     '''register a function to a stack with a stack name
     
     :param stack_id: stack identifier to register function with
+    :param executor: pool running the function in parallel batches, 'thread' (default) or 'process'
     '''
     def decorator(func):
         original_func = getattr(func, "__wrapped__", func)
-        stack.add_func(stack_id, original_func)
+        stack.add_func(stack_id, original_func, executor)
         return func
     return decorator
 
 
-def cli(stack_id: str, desc : str = None):
+def register_lazy(stack_id: str, target: str, executor: str = None):
+    '''register a function by dotted path, its module is imported only when the command runs
+
+    :param stack_id: stack identifier to register function with
+    :param target: function reference as 'package.module:function'
+    :param executor: pool running the function in parallel batches, 'thread' (default) or 'process'
+    '''
+    func = spec_handler.LazyFunc(target)
+    stack.add_func(stack_id, func, executor)
+    return func
+
+
+def cli(stack_id: str, desc : str = None, cache=False):
     '''init cli and register to a stack
     
     :param stack_id: stack identifier to register to CLI
     :param desc: description of the CLI
+    :param cache: cache command specs on disk, True stores them next to the script or pass a file path
     '''
 
     cli_obj = cli_handler.CLI(desc)
 
+    # build commands from cached specs instead of introspecting them
+    if cache:
+        if cache is True:
+            script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+            cache = os.path.join(script_dir, f'.{cli_obj.name}.stakk.json')
+        stack.specs = cli_obj.specs = spec_handler.SpecCache(cache)
+
     cli_obj.add_funcs(stack.get_stack(stack_id))
+    cli_obj.executors = stack.executors.get(stack_id, {})
+    if cache:
+        stack.specs.save()
     cli_obj.parse()
     stack.add_cli(cli_obj)
     return cli_obj
+
+
+
+def bench(stack_id: str, args: dict = None, warmup: int = 1, rounds: int = 10,
+          min_time: float = 0.05, disable_gc: bool = False, confidence: float = 0.95) -> dict:
+    '''benchmark every function registered to a stack
+
+    :param stack_id: stack identifier of the functions to benchmark
+    :param args: argument sets by function name, a list of argument sets or a single one,
+        each a tuple of args or a dict of kwargs
+    :param warmup: rounds to run and discard before measuring
+    :param rounds: measured rounds per function
+    :param min_time: minimum duration of a round, used to calibrate the loop count
+    :param disable_gc: disable the garbage collector while measuring
+    :param confidence: confidence level of the reported interval
+    '''
+
+    runner = runner_handler.Runner(warmup, rounds, min_time, disable_gc, confidence)
+    return runner.run(stack.get_stack(stack_id), args)
@@ -0,0 +1,146 @@
+import sys, json, math, time, argparse, statistics
+from stakk.stats_handler import Stats
+
+FORMAT_VERSION = 1
+
+class Baseline:
+    """versioned snapshot of benchmark samples used to detect regressions"""
+
+    def __init__(self, samples: dict, label: str = None, created: float = None):
+        """init baseline
+
+        :param samples: benchmark samples in seconds by function name
+        :param label: free form version label, e.g. a release or commit
+        :param created: unix timestamp of the snapshot
+        """
+        self.samples = samples
+        self.label = label
+        self.created = time.time() if created is None else created
+
+    @classmethod
+    def from_results(cls, results: dict, label: str = None, sketch_samples: int = 1000):
+        """collect samples from a benchy report or benchmark runner results
+
+        :param results: `stakk.benchy.report` or results of `stakk.bench`
+        :param label: free form version label, e.g. a release or commit
+        :param sketch_samples: samples drawn from the quantile sketch of aggregated functions
+        """
+        samples = {}
+        for name, data in results.items():
+            if isinstance(data, Stats):
+                # aggregated functions only keep a sketch, sample it by quantile
+                if data.count:
+                    # sampled counts are weighted, probabilistic weights make them floats
+                    count = min(int(data.count), sketch_samples)
+                    samples[name] = [data.sketch.quantile((i + 0.5) / count) for i in range(count)]
+            elif isinstance(data, dict):
+                samples[name] = list(data['timings'])  # runner result
+            elif hasattr(data, 'columns'):
+                samples[name] = list(data['benchmark'])  # columnar store
+            else:
+                samples[name] = [record['benchmark'] for record in data]
+        return cls(samples, label)
+
+    @classmethod
+    def load(cls, path: str):
+        """load a baseline file"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"unsupported baseline version {data.get('version')!r} in {path}")
+        return cls(data['samples'], data.get('label'), data.get('created'))
+
+    def save(self, path: str):
+        """write the baseline to a json file"""
+        from stakk import __version__
+
+        data = {
+            'version': FORMAT_VERSION,
+            'stakk': __version__,
+            'label': self.label,
+            'created': self.created,
+            'samples': self.samples,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def compare(self, current, alpha: float = 0.05) -> dict:
+        """compare current samples against this baseline per function
+
+        :param current: baseline of the new run
+        :param alpha: significance level of the mann-whitney u test
+        :return: verdict ('faster', 'slower' or 'same'), median ratio and
+            p value by function name, for functions present in both
+        """
+        verdicts = {}
+        for name, samples in current.samples.items():
+            if name not in self.samples or not samples or not self.samples[name]:
+                continue
+            before = statistics.median(self.samples[name])
+            after = statistics.median(samples)
+            p_value = self.mann_whitney(self.samples[name], samples)
+            ratio = after / before if before else math.inf
+
+            verdict = 'same'
+            if p_value < alpha:
+                verdict = 'slower' if ratio > 1 else 'faster'
+            verdicts[name] = {'verdict': verdict, 'ratio': ratio, 'p_value': p_value,
+                              'baseline': before, 'current': after}
+        return verdicts
+
+    @staticmethod
+    def mann_whitney(x: list, y: list) -> float:
+        """two sided p value of the mann-whitney u test (normal approximation with tie correction)"""
+        n1, n2 = len(x), len(y)
+        values = sorted([(v, 0) for v in x] + [(v, 1) for v in y])
+
+        # rank values, averaging ranks of ties
+        rank_sum, ties, i = 0.0, 0.0, 0
+        while i < len(values):
+            j = i
+            while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+                j += 1
+            rank = (i + j) / 2 + 1
+            rank_sum += rank * sum(1 for k in range(i, j + 1) if values[k][1] == 0)
+            count = j - i + 1
+            ties += count ** 3 - count
+            i = j + 1
+
+        u = rank_sum - n1 * (n1 + 1) / 2
+        n = n1 + n2
+        variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+        if variance <= 0:
+            return 1.0
+        z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)  # continuity correction
+        return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def check(verdicts: dict, threshold: float = 0.05) -> int:
+    """exit code for a comparison, 1 if a function is slower by more than threshold
+
+    :param verdicts: result of `Baseline.compare`
+    :param threshold: tolerated relative slowdown, 0.05 is 5%
+    """
+    for result in verdicts.values():
+        if result['verdict'] == 'slower' and result['ratio'] > 1 + threshold:
+            return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    """compare two baseline files, exits 1 when a function regressed"""
+    parser = argparse.ArgumentParser(prog='stakk.baseline_handler', description=main.__doc__)
+    parser.add_argument('baseline', help='baseline file to compare against')
+    parser.add_argument('current', help='baseline file of the new run')
+    parser.add_argument('-t', '--threshold', type=float, default=0.05, help='tolerated relative slowdown')
+    parser.add_argument('-a', '--alpha', type=float, default=0.05, help='significance level')
+    args = parser.parse_args(argv)
+
+    verdicts = Baseline.load(args.baseline).compare(Baseline.load(args.current), args.alpha)
+    for name, result in verdicts.items():
+        print(f"{name}: {result['verdict']} ({result['ratio']:.3f}x, p={result['p_value']:.4f})")
+    return check(verdicts, args.threshold)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,52 @@
-import inspect, os, argparse, sys, asyncio, re
+import inspect, os, argparse, sys, asyncio, re, json, shlex, threading, contextlib, collections
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from stakk import runner_handler, spec_handler
+
+class LazyParsers(dict):
+    """subparser map building a command parser the first time it is looked up"""
+
+    def __init__(self):
+        super().__init__()
+        self.builders = {}  # command name -> parser builder
+
+    def add(self, name, builder):
+        """register a command stub, the parser is built by builder(name) on first access"""
+        self.builders[name] = builder
+        dict.__setitem__(self, name, None)
+
+    def __getitem__(self, name):
+        parser = dict.__getitem__(self, name)
+        if parser is None:
+            parser = self.builders[name](name)
+            dict.__setitem__(self, name, parser)
+        return parser
+
+
+class BatchError(Exception):
+    """invalid batch line"""
+
+    def __init__(self, message, ident=None, command=None):
+        super().__init__(message)
+        self.ident = ident
+        self.command = command
+
+
+class Parser(argparse.ArgumentParser):
+    """argument parser raising BatchError instead of printing and exiting while parsing a batch line"""
+
+    local = threading.local()  # batch line parsing state of the current thread
+    command = None  # command name of a command parser
+
+    def error(self, message):
+        if getattr(self.local, 'batch', False):
+            raise BatchError(f"{self.prog}: error: {message}", command=self.command)
+        super().error(message)
+
+    def print_help(self, file=None):
+        if getattr(self.local, 'batch', False):
+            raise BatchError("-h/--help can't be used on a batch line", command=self.command)
+        super().print_help(file)
+
 
 class CLI:
     """object designed for swift module CLI configuration"""
@@ -16,11 +64,57 @@ class CLI:
             self.name = file_name[:-3] # case script
 
         # define root parser
-        self.parser = argparse.ArgumentParser(prog=self.name, description=desc)
-        # add commands subparser
+        self.parser = Parser(prog=self.name, description=desc)
+        # add benchmark meta options, private dests so command parameters of the same name can't override them
+        self.parser.add_argument(
+            "--bench", metavar="N", type=int, dest="_stakk_bench",
+            help="run the command N times and print latency percentiles and throughput"
+        )
+        self.parser.add_argument(
+            "--warmup", metavar="N", type=int, default=10, dest="_stakk_warmup",
+            help="calls discarded before benchmarking (default: 10)"
+        )
+        # add batch meta option
+        self.parser.add_argument(
+            "--batch", metavar="FILE", dest="_stakk_batch",
+            help="run one command per line of FILE ('-' for stdin) and print ndjson results"
+        )
+        self.parser.add_argument(
+            "--jobs", metavar="N", type=int, default=1, dest="_stakk_jobs",
+            help="batch commands run concurrently (default: 1)"
+        )
+        self.parser.add_argument(
+            "--ordered", action="store_true", dest="_stakk_ordered",
+            help="write batch results in input order instead of as they complete"
+        )
+        # add commands subparser, command parsers are built lazily
         self.subparsers = self.parser.add_subparsers(title="commands", dest="command")
+        # argparse has no public hook for lazy subparsers: _SubParsersAction looks commands up in the
+        # private _name_parser_map (choices is the same dict), so both are replaced by a map building
+        # the parser on lookup. pinned by test_argparse_internals
+        self.subparsers._name_parser_map = self.subparsers.choices = LazyParsers()
         self.func_dict = {}  # init empty func dict
         self.input = None
+        self.specs = None  # optional spec cache of command descriptions
+        self.executors = {}  # batch executor hints by command, 'thread' or 'process'
+
+    @staticmethod
+    def format_time(seconds):
+        """format a duration with a readable unit"""
+        for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+            if seconds >= scale:
+                return f"{seconds / scale:.3g} {unit}"
+        return f"{seconds / 1e-9:.3g} ns"
+
+    def format_latency(self, command, result):
+        """format latency percentiles and throughput of a benchmarked command"""
+        percentiles = " | ".join(
+            f"{key} {self.format_time(result[key])}" for key in ("min", "p50", "p90", "p99", "max", "mean")
+        )
+        throughput = f"{result['throughput']:.1f} calls/s" if result['throughput'] else "n/a"
+        return (f"{command}: {result['runs']} runs, {result['warmup']} warmup\n"
+                f"{percentiles}\n"
+                f"throughput: {throughput}")
 
     @staticmethod
     def type_list(value):
@@ -50,159 +144,188 @@ class CLI:
         return partial
 
 
-    def add_funcs(self, func_dict):
-        """add registered functions to the cli"""
+    @staticmethod
+    def is_iterable(obj):
+        """check if the object is an iterable."""
+        try:
+            iter(obj)
+            return True
+        except TypeError:
+            return False
 
-        def is_iterable(obj):
-            """check if the object is an iterable."""
-            try:
-                iter(obj)
-                return True
-            except TypeError:
-                return False
+    @staticmethod
+    def summary(func_name, items):
+        """one-line summary of a command for the top-level help"""
+        desc = (items['desc'] or '').strip()
+        if desc:
+            return desc.splitlines()[0]
+        return f"execute {func_name} function"
+
+    @classmethod
+    def describe(cls, func, types):
+        """format the signature of a command for its help description"""
+
+        # collect command description
+        signature = inspect.signature(func)
+        if not signature.parameters:
+            description = f"{func.__name__}()"
+
+        # collect names and params for a given function
+        params = []
+        for name, param in signature.parameters.items():
             
-        self.func_dict = func_dict  # assign function dictionary property
-
-        # iterate through registered functions
-        for func_name, items in func_dict.items():
-            names = items['names']  # collect arg names
-            types = items['types']  # collect types of arg
-            arg_types = [types.get(name, None) for name in names]
-            defaults = items['defaults']  # collect default args
-
-            # init arg help and arg description
-            help_description = f"execute {func_name} function"
-
-            # collect command description
-            signature = inspect.signature(func_dict[func_name]['func'])
-            if not signature.parameters:
-                description = f"{func_dict[func_name]['func'].__name__}()"
-
-            # collect names and params for a given function
-            params = []
-            for name, param in signature.parameters.items():
-                
-                # init choices
-                choices = None
-
-                # check if the annotation is an iterable
-                if is_iterable(param.annotation) and not isinstance(param.annotation, str):
-                    choices = param.annotation
-                    arg_type = self.custom_partial(self.choice_type, choices=choices)
-                elif param.annotation == list:
-                    arg_type = self.type_list
+            # init choices
+            choices = None
+
+            # check if the annotation is an iterable
+            if cls.is_iterable(param.annotation) and not isinstance(param.annotation, str):
+                choices = param.annotation
+                arg_type = cls.custom_partial(cls.choice_type, choices=choices)
+            elif param.annotation == list:
+                arg_type = cls.type_list
+            else:
+                arg_type = param.annotation
+
+            # check if function contains annotations
+            if param.annotation != inspect.Parameter.empty:
+                # if default arg exists display in docs
+                if param.default != inspect.Parameter.empty:
+                    params.append(
+                        f"{name}: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type} = {param.default!r}"
+                    )
                 else:
-                    arg_type = param.annotation
-
-                # check if function contains annotations
-                if param.annotation != inspect.Parameter.empty:
-                    # if default arg exists display in docs
-                    if param.default != inspect.Parameter.empty:
-                        params.append(
-                            f"{name}: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type} = {param.default!r}"
-                        )
-                    else:
-                        params.append(f"{name}: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type}")
+                    params.append(f"{name}: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type}")
+            else:
+                if param.default != inspect.Parameter.empty:
+                    params.append(f"{name} = {param.default!r}")
                 else:
-                    if param.default != inspect.Parameter.empty:
-                        params.append(f"{name} = {param.default!r}")
-                    else:
-                        params.append(f"{name}")
+                    params.append(f"{name}")
 
-                # define return type if exists for docs
-                if "return" in types:
-                    description = f"{func_dict[func_name]['func'].__name__}({', '.join(params)}) -> {str(types['return'].__name__)}"
-                else:
-                    description = f"{func_dict[func_name]['func'].__name__}({', '.join(params)})"
-
-                # define help string
-                if items['desc'] is not None:
-                    help_description = items['desc']
-
-            # after gathering all the information about the parameters, add the command
-            subp = self.subparsers.add_parser(
-                func_name,
-                help=help_description,
-                description=description,
-                argument_default=argparse.SUPPRESS,
-                add_help=False,
+            # define return type if exists for docs
+            if "return" in types:
+                description = f"{func.__name__}({', '.join(params)}) -> {str(types['return'].__name__)}"
+            else:
+                description = f"{func.__name__}({', '.join(params)})"
+
+        return description
+
+    def add_funcs(self, func_dict):
+        """add registered functions to the cli, command parsers are built on first use"""
+
+        self.func_dict = func_dict  # assign function dictionary property
+
+        # register a lightweight stub for each command, help renders from the summaries.
+        # add_parser would build the parser, so the help entry it adds to the private _choices_actions
+        # is added directly with the private _ChoicesPseudoAction add_parser uses
+        for func_name, items in func_dict.items():
+            self.subparsers._choices_actions.append(
+                self.subparsers._ChoicesPseudoAction(func_name, (), self.summary(func_name, items))
             )
+            self.subparsers.choices.add(func_name, self.build_parser)
+
+    def build_parser(self, func_name):
+        """build the full subparser of a command"""
+
+        items = self.func_dict[func_name]
+        names = items['names']  # collect arg names
+        types = items['types']  # collect types of arg
+        arg_types = [types.get(name, None) for name in names]
+        defaults = items['defaults']  # collect default args
+
+        # collect command description, from the spec cache when available
+        description = None
+        if self.specs is not None:
+            description = self.specs.description(items['stack'], func_name)
+        if description is None:
+            description = self.describe(items['func'], types)
+
+        # after gathering all the information about the parameters, build the command parser.
+        # this mirrors add_parser, which reads the private _parser_class (the root parser class)
+        # and _prog_prefix (root prog and positionals) for the command prog
+        subp = self.subparsers._parser_class(
+            prog=f"{self.subparsers._prog_prefix} {func_name}",
+            description=description,
+            argument_default=argparse.SUPPRESS,
+            add_help=False,
+        )
+        subp.command = func_name
+
+        # create abbreviations for named short name
+        abbrevs = set()
+        for name, arg_type in zip(names, arg_types):
+            choices = None  # reset choices at the beginning of each iteration
+            if self.is_iterable(types.get(name, None)) and not isinstance(types.get(name, None), str):
+                choices = types[name]
+                arg_type = self.custom_partial(self.choice_type, choices=types[name])
+            elif types.get(name, None) == list:
+                arg_type = self.type_list
+
+            help_string = ""
+            if choices:
+                help_string += f"choices: ({', '.join(map(str, choices))})"
+            else:
+                if arg_type is self.type_list:
+                    help_string += "type: list"
+                elif arg_type is not None:
+                    help_string += f"type: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type}"
+            if name in defaults:
+                if help_string:
+                    help_string += ", "
+                help_string += f"default: {defaults[name]}"
+
+            if name in defaults:
+                # default abbreviation is the first 2 characters
+                short_name = name[:2]
+                # if space is taken define short name as just the list character
+                if short_name in abbrevs:
+                    short_name = name[-1]
+                abbrevs.add(short_name)
 
-            # create abbreviations for named short name
-            abbrevs = set()
-            for name, arg_type in zip(names, arg_types):
-                choices = None  # reset choices at the beginning of each iteration
-                if is_iterable(types.get(name, None)) and not isinstance(types.get(name, None), str):
-                    choices = types[name]
-                    arg_type = self.custom_partial(self.choice_type, choices=types[name])
-                elif types.get(name, None) == list:
-                    arg_type = self.type_list
-
-                help_string = ""
-                if choices:
-                    help_string += f"choices: ({', '.join(map(str, choices))})"
+                try:
+                    subp.add_argument(
+                        f"-{short_name}",
+                        f"--{name}",
+                        metavar=name.upper(),
+                        type=arg_type,
+                        default=defaults[name],
+                        help=help_string,
+                        choices=choices if choices else None,
+                    )
+                except argparse.ArgumentError:
+                    subp.add_argument(
+                        f"--{name}",
+                        metavar=name.upper(),
+                        type=arg_type,
+                        default=defaults[name],
+                        help=help_string,
+                        choices=choices if choices else None,
+                    )
+            else:
+                # if variadic allow any number of args
+                if items['variadic']:
+                    if name == '*args':
+                        help_string = '       ex: command arg1 arg2'
+                    elif name == '**kwargs':
+                        help_string = '    ex: command key=value'
+                    subp.add_argument(
+                        name, nargs='*', 
+                        type=arg_type, 
+                        help=help_string
+                    )
                 else:
-                    if arg_type is self.type_list:
-                        help_string += "type: list"
-                    elif arg_type is not None:
-                        help_string += f"type: {arg_type.__name__ if hasattr(arg_type, '__name__') else arg_type}"
-                if name in defaults:
-                    if help_string:
-                        help_string += ", "
-                    help_string += f"default: {defaults[name]}"
-
-                if name in defaults:
-                    # default abbreviation is the first 2 characters
-                    short_name = name[:2]
-                    # if space is taken define short name as just the list character
-                    if short_name in abbrevs:
-                        short_name = name[-1]
-                    abbrevs.add(short_name)
+                    subp.add_argument(
+                        name, 
+                        metavar=name,
+                        type=arg_type, 
+                        help=help_string,
+                        choices=choices if choices else None
+                    )
 
-                    try:
-                        subp.add_argument(
-                            f"-{short_name}",
-                            f"--{name}",
-                            metavar=name.upper(),
-                            type=arg_type,
-                            default=defaults[name],
-                            help=help_string,
-                            choices=choices if choices else None,
-                        )
-                    except argparse.ArgumentError:
-                        subp.add_argument(
-                            f"--{name}",
-                            metavar=name.upper(),
-                            type=arg_type,
-                            default=defaults[name],
-                            help=help_string,
-                            choices=choices if choices else None,
-                        )
-                else:
-                    # if variadic allow any number of args
-                    if items['variadic']:
-                        if name == '*args':
-                            help_string = '       ex: command arg1 arg2'
-                        elif name == '**kwargs':
-                            help_string = '    ex: command key=value'
-                        subp.add_argument(
-                            name, nargs='*', 
-                            type=arg_type, 
-                            help=help_string
-                        )
-                    else:
-                        subp.add_argument(
-                            name, 
-                            metavar=name,
-                            type=arg_type, 
-                            help=help_string,
-                            choices=choices if choices else None
-                        )
-
-            # override help & place at end of options
-            subp.add_argument(
-                "-h", "--help", action="help", help="Show this help message and exit."
-            )
+        # override help & place at end of options
+        subp.add_argument(
+            "-h", "--help", action="help", help="Show this help message and exit."
+        )
+        return subp
 
 
 
@@ -211,37 +334,26 @@ class CLI:
 
         self.input = self.parser.parse_args()
 
+        # run every command of a batch file with this parser
+        batch = getattr(self.input, '_stakk_batch', None)
+        if batch is not None:
+            jobs = getattr(self.input, '_stakk_jobs', 1) or 1
+            failures = self.run_batch(batch, jobs, getattr(self.input, '_stakk_ordered', False))
+            sys.exit(1 if failures else 0)
+
         # if command in input namespace
         if self.input.command:
-            # retrieve function and arg names for given command
-            func_meta = self.func_dict[self.input.command]
-            args = []
-            kwargs = {}
-
-            # if variadic define args and kwargs
-            if func_meta['variadic']:
-                func = func_meta['func']
-                try:
-                    for arg in vars(self.input)['*args']:
-                        if '=' in arg:
-                            k,v = arg.split('=')
-                            kwargs[k] = v
-                        else:
-                            args.append(arg)
-                except KeyError:
-                    # pass because args & kwargs are already defined empty
-                    pass
-            else:
+            func, args, kwargs = self.prepare(self.input)
+
+            # benchmark the command instead of printing its return
+            runs = getattr(self.input, '_stakk_bench', None)
+            if runs is not None:
+                if runs < 1:
+                    self.parser.error("--bench requires a positive number of runs")
+                runner = runner_handler.Runner(warmup=max(getattr(self.input, '_stakk_warmup', 10), 0))
+                print(self.format_latency(self.input.command, runner.latency(func, runs, args, kwargs)))
+                sys.exit()
 
-                # unpack just the args and function
-                func, arg_names = (
-                    func_meta['func'],
-                    func_meta['names'],
-                )
-            
-                # collect args from input namespace
-                args = [getattr(self.input, arg) for arg in arg_names]
-            
             # run function with given args and collect any returns
             if asyncio.iscoroutinefunction(func):
                 returned = asyncio.run(func(*args, **kwargs))
@@ -253,4 +365,226 @@ class CLI:
                 print(returned)
 
             # exit the interpreter so the entire script is not run
-            sys.exit() 
+            sys.exit()
+
+    def prepare(self, namespace):
+        """collect the function, args and kwargs of a parsed command"""
+
+        # retrieve function and arg names for given command
+        func_meta = self.func_dict[namespace.command]
+        args = []
+        kwargs = {}
+
+        # if variadic define args and kwargs
+        if func_meta['variadic']:
+            func = func_meta['func']
+            try:
+                for arg in vars(namespace)['*args']:
+                    if '=' in arg:
+                        k,v = arg.split('=')
+                        kwargs[k] = v
+                    else:
+                        args.append(arg)
+            except KeyError:
+                # pass because args & kwargs are already defined empty
+                pass
+        else:
+
+            # unpack just the args and function
+            func, arg_names = (
+                func_meta['func'],
+                func_meta['names'],
+            )
+
+            # collect args from input namespace
+            args = [getattr(namespace, arg) for arg in arg_names]
+
+        # import lazily registered commands only now they run
+        if isinstance(func, spec_handler.LazyFunc):
+            func = func.resolve()
+
+        return func, args, kwargs
+
+    @staticmethod
+    def batch_argv(line):
+        """split a batch line into an optional id and the command argv
+
+        a line is a json array of args, a json object with "argv" and an optional "id",
+        or a shell style command string
+        """
+        if line[0] in '[{':
+            data = json.loads(line)
+            if isinstance(data, dict):
+                return data.get('id'), [str(arg) for arg in data['argv']]
+            return None, [str(arg) for arg in data]
+        return None, shlex.split(line)
+
+    def parse_line(self, line):
+        """parse one batch line with the cli parser, argparse errors raise BatchError"""
+        ident, argv = self.batch_argv(line)
+
+        # the parser raises instead of writing to stderr, commands may be writing to it from pool workers
+        Parser.local.batch = True
+        try:
+            namespace = self.parser.parse_args(argv)
+        except BatchError as e:
+            e.ident = ident
+            raise
+        finally:
+            Parser.local.batch = False
+        if getattr(namespace, '_stakk_batch', None) is not None or getattr(namespace, '_stakk_bench', None) is not None:
+            raise BatchError("--batch and --bench can't be used on a batch line", ident, namespace.command)
+        if not namespace.command:
+            raise BatchError("no command given", ident)
+        return ident, namespace
+
+    @staticmethod
+    def result(number, ident, command, status, **fields) -> dict:
+        """ndjson record of a batch line"""
+        record = {'line': number}
+        if ident is not None:
+            record['id'] = ident
+        record.update(command=command, status=status, **fields)
+        return record
+
+    def run_line(self, number, line, loop=None) -> dict:
+        """parse and run one batch line, errors are returned as the record status"""
+        ident, command = None, None
+        try:
+            ident, namespace = self.parse_line(line)
+            command = namespace.command
+            func, args, kwargs = self.prepare(namespace)
+            if asyncio.iscoroutinefunction(func):
+                returned = loop.run_until_complete(func(*args, **kwargs))
+            else:
+                returned = func(*args, **kwargs)
+        except BatchError as e:
+            return self.result(number, e.ident, e.command or command, 'error', error=str(e), type='ArgumentError')
+        except (Exception, SystemExit) as e:
+            return self.result(number, ident, command, 'error', error=str(e), type=type(e).__name__)
+        return self.result(number, ident, command, 'ok', result=returned)
+
+    def run_batch(self, source, jobs: int = 1, ordered: bool = False) -> int:
+        """run every command of a batch file or stdin ('-'), writing one ndjson result per line
+
+        :param source: batch file path or '-' for stdin
+        :param jobs: commands run concurrently, each on the thread or process pool of its executor hint
+        :param ordered: write results in input order rather than as they complete
+        :return: number of failed lines
+        """
+        stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+        output = sys.stdout
+        failures = 0
+
+        def emit(record):
+            nonlocal failures
+            failures += record['status'] != 'ok'
+            output.write(json.dumps(record, default=repr) + '\n')
+            output.flush()
+
+        try:
+            # printed output of commands goes to stderr, stdout carries the results
+            with contextlib.redirect_stdout(sys.stderr):
+                lines = ((number, line.strip()) for number, line in enumerate(stream, 1))
+                lines = ((number, line) for number, line in lines if line and not line.startswith('#'))
+                if jobs > 1:
+                    self.dispatch(lines, jobs, ordered, emit)
+                else:
+                    loop = asyncio.new_event_loop()  # reused by every coroutine command
+                    try:
+                        for number, line in lines:
+                            emit(self.run_line(number, line, loop))
+                    finally:
+                        loop.close()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        return failures
+
+    def submit(self, pools, jobs, number, line):
+        """parse a batch line and submit it to the pool of its command
+
+        :return: (number, ident, command, future), parse errors come back as a finished record
+        """
+        try:
+            ident, namespace = self.parse_line(line)
+        except BatchError as e:
+            return number, e.ident, e.command, self.result(number, e.ident, e.command, 'error', error=str(e),
+                                                           type='ArgumentError')
+        except Exception as e:
+            return number, None, None, self.result(number, None, None, 'error', error=str(e), type=type(e).__name__)
+
+        command = namespace.command
+        try:
+            func, args, kwargs = self.prepare(namespace)
+            executor = self.executors.get(command, 'thread')
+            if executor not in pools:
+                if executor == 'process':
+                    pools[executor] = ProcessPoolExecutor(jobs, initializer=quiet)
+                else:
+                    pools[executor] = ThreadPoolExecutor(jobs)
+            return number, ident, command, pools[executor].submit(invoke, func, args, kwargs)
+        except Exception as e:
+            return number, ident, command, self.result(number, ident, command, 'error', error=str(e), type=type(e).__name__)
+
+    def finish(self, number, ident, command, future) -> dict:
+        """ndjson record of a submitted batch line, waits for it to complete"""
+        if isinstance(future, dict):
+            return future  # failed before it was submitted
+        try:
+            returned = future.result()
+        except (Exception, SystemExit) as e:
+            return self.result(number, ident, command, 'error', error=str(e), type=type(e).__name__)
+        return self.result(number, ident, command, 'ok', result=returned)
+
+    def dispatch(self, lines, jobs: int, ordered: bool, emit):
+        """run batch lines on thread / process pools with bounded in-flight work"""
+        pools = {}
+        limit = jobs * 4  # lines read ahead of the results written
+        try:
+            if ordered:
+                # reorder buffer, results are written once every earlier line is written
+                pending = collections.deque()
+                for number, line in lines:
+                    pending.append(self.submit(pools, jobs, number, line))
+                    while pending and (len(pending) >= limit or self.done(pending[0][3])):
+                        emit(self.finish(*pending.popleft()))
+                while pending:
+                    emit(self.finish(*pending.popleft()))
+            else:
+                # stream results as they complete
+                pending = {}
+                for number, line in lines:
+                    item = self.submit(pools, jobs, number, line)
+                    if isinstance(item[3], dict):
+                        emit(item[3])
+                        continue
+                    pending[item[3]] = item
+                    if len(pending) >= limit:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            emit(self.finish(*pending.pop(future)))
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(self.finish(*pending.pop(future)))
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+
+    @staticmethod
+    def done(future) -> bool:
+        """check if a submitted batch line has a result"""
+        return isinstance(future, dict) or future.done()
+
+
+def invoke(func, args, kwargs):
+    """run a batch command in a pool worker"""
+    if asyncio.iscoroutinefunction(func):
+        return asyncio.run(func(*args, **kwargs))
+    return func(*args, **kwargs)
+
+
+def quiet():
+    """send printed output of process pool workers to stderr, stdout carries the results"""
+    sys.stdout = sys.stderr
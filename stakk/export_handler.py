@@ -0,0 +1,139 @@
+import os, io, csv, json, time, struct, atexit, threading, collections
+
+class Exporter:
+    """background writer streaming benchmark records to a file"""
+
+    formats = ('jsonl', 'csv', 'binary')
+
+    # csv columns, remaining record fields are collected into `extra`
+    fields = ('time', 'function', 'benchmark', 'exclusive', 'path', 'args', 'kwargs', 'result', 'extra')
+
+    # binary record header: time, benchmark, exclusive, function name length
+    header = struct.Struct('<dddH')
+
+    def __init__(self, path: str, fmt: str = 'jsonl', flush_interval: float = 1.0,
+                 max_bytes: int = None, backups: int = 5):
+        """open the sink file and start the writer thread
+
+        :param path: file path to write records to
+        :param fmt: file format, one of 'jsonl', 'csv' or 'binary'
+        :param flush_interval: seconds between batched writes
+        :param max_bytes: rotate the file once it grows past this size
+        :param backups: number of rotated files to keep
+        """
+        if fmt not in self.formats:
+            raise ValueError(f"fmt must be one of {self.formats}")
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = collections.deque()  # atomic append / popleft handoff
+        self.file = self._open()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stakk-exporter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, name, record):
+        """enqueue a record, called on the recording hot path"""
+        self.queue.append((time.time(), name, record))
+
+    def drain(self):
+        """write every queued record as one batch"""
+        queue = self.queue
+        batch = []
+        for _ in range(len(queue)):
+            batch.append(queue.popleft())
+        if not batch:
+            return
+
+        if self.fmt == 'binary':
+            self.file.write(b''.join(self._encode_binary(*item) for item in batch))
+        elif self.fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(self._encode_csv(*item) for item in batch)
+            self.file.write(buffer.getvalue())
+        else:
+            self.file.write(''.join(self._encode_json(*item) for item in batch))
+        self.file.flush()
+
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        """stop the writer thread and write remaining records"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.file.close()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        """writer thread loop"""
+        while not self._stop.wait(self.flush_interval):
+            self.drain()
+        self.drain()
+
+    def _open(self):
+        """open the sink file, writing the csv header on new files"""
+        if self.fmt == 'binary':
+            return open(self.path, 'ab')
+        new = not os.path.exists(self.path) or not os.path.getsize(self.path)
+        file = open(self.path, 'a', newline='', encoding='utf-8')
+        if self.fmt == 'csv' and new:
+            csv.writer(file).writerow(self.fields)
+        return file
+
+    def _rotate(self):
+        """rotate path -> path.1 -> path.2 ... keeping `backups` files"""
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.file = self._open()
+
+    @staticmethod
+    def _encode_json(timestamp, name, record):
+        """encode a record as a json line"""
+        return json.dumps({'time': timestamp, 'function': name, **record}, default=repr) + '\n'
+
+    def _encode_csv(self, timestamp, name, record):
+        """encode a record as a csv row"""
+        record = dict(record)
+        row = [timestamp, name, record.pop('benchmark'), record.pop('exclusive', ''), record.pop('path', '')]
+        for field in ('args', 'kwargs', 'result'):
+            row.append(json.dumps(record.pop(field, None), default=repr))
+        row.append(json.dumps(record, default=repr) if record else '')
+        return row
+
+    def _encode_binary(self, timestamp, name, record):
+        """encode a record as a fixed header followed by the function name"""
+        name = name.encode('utf-8')
+        exclusive = record.get('exclusive')
+        return self.header.pack(timestamp, record['benchmark'],
+                                float('nan') if exclusive is None else exclusive, len(name)) + name
+
+
+def read_binary(path: str):
+    """iterate records from a binary export file"""
+    header = Exporter.header
+    with open(path, 'rb') as file:
+        data = file.read()
+    offset = 0
+    while offset + header.size <= len(data):
+        timestamp, benchmark, exclusive, length = header.unpack_from(data, offset)
+        offset += header.size
+
+        # stop at a record truncated by a crash
+        if offset + length > len(data):
+            break
+        name = data[offset:offset + length].decode('utf-8')
+        offset += length
+        yield {'time': timestamp, 'function': name, 'benchmark': benchmark, 'exclusive': exclusive}
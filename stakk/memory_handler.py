@@ -0,0 +1,71 @@
+import gc, time, threading, tracemalloc
+
+class GCMonitor:
+    """gc.callbacks hook counting collections and time spent collecting"""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]  # collections by generation
+        self.time = 0.0  # seconds spent collecting
+        self._start_time = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start_time = time.perf_counter()
+        elif self._start_time is not None:
+            self.time += time.perf_counter() - self._start_time
+            self.collections[info['generation']] += 1
+            self._start_time = None
+
+    def install(self):
+        """register the hook with the garbage collector"""
+        if self not in gc.callbacks:
+            gc.callbacks.append(self)
+
+    def uninstall(self):
+        """remove the hook from the garbage collector"""
+        if self in gc.callbacks:
+            gc.callbacks.remove(self)
+
+
+class MemoryProbe:
+    """per call traced memory and garbage collection measurements"""
+
+    def __init__(self):
+        self.gc_monitor = GCMonitor()
+        self.active = {}  # states of calls being measured, nested or concurrent
+        self._lock = threading.Lock()
+
+    def install(self):
+        """start tracing allocations and collections"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.gc_monitor.install()
+
+    def start(self):
+        """snapshot counters before a call"""
+        if not tracemalloc.is_tracing():
+            self.install()
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            # limit the peak to this call where supported (python 3.9+), the peak is process wide
+            # so it is folded into the calls already measured before it is reset
+            if hasattr(tracemalloc, 'reset_peak'):
+                for state in self.active.values():
+                    state[3] = max(state[3], peak)
+                tracemalloc.reset_peak()
+            state = [current, list(self.gc_monitor.collections), self.gc_monitor.time, current]
+            self.active[id(state)] = state
+        return state
+
+    def stop(self, state) -> dict:
+        """measure the difference since `start` for a call"""
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            self.active.pop(id(state), None)
+        start_memory, start_collections, start_time, folded_peak = state
+        peak = max(peak, folded_peak)
+        collections = [after - before for after, before in zip(self.gc_monitor.collections, start_collections)]
+        return {
+            'memory': {'peak': max(peak - start_memory, 0), 'net': current - start_memory},
+            'gc': {'collections': collections, 'time': self.gc_monitor.time - start_time},
+        }
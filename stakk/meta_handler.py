@@ -1,21 +1,41 @@
 import inspect
+from stakk import spec_handler
+from stakk.cli_handler import CLI
 
 class Stack:
     """internal object for storing function dictionary"""
 
     def __init__(self):
         self.funcs = {}  # init function registration dictionary by stack
+        self.pending = {}  # functions awaiting introspection by stack
         self.cli = None  # init cli object stack
         self.stacks = set()
+        self.specs = None  # optional spec cache replacing introspection
+        self.executors = {}  # batch executor hints by stack and function name
 
-    def add_func(self, stack: str, func):
-        """registers a function to the function dictionary"""
+    def add_func(self, stack: str, func, executor: str = None):
+        """registers a function to the function dictionary, introspection is deferred to first use
+
+        :param executor: batch executor hint, 'thread' for i/o bound or 'process' for cpu bound functions
+        """
+        if executor not in (None, 'thread', 'process'):
+            raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+        self.stacks.add(stack)
+        self.funcs.get(stack, {}).pop(func.__name__, None)
+        self.pending.setdefault(stack, {})[func.__name__] = func
+        hints = self.executors.setdefault(stack, {})
+        if executor is None:
+            hints.pop(func.__name__, None)
+        else:
+            hints[func.__name__] = executor
+
+    def introspect(self, stack: str, func) -> dict:
+        """collect the meta info of a function"""
         names = inspect.getfullargspec(func).args  # collect arg names
         types = inspect.getfullargspec(func).annotations  # collect types of args
         defaults = self._get_defaults(func)
         desc = None
         variadic = False
-        self.stacks.add(stack)
 
         # if docstring exists and no description defined set desc
         if func.__doc__:
@@ -40,10 +60,7 @@ class Stack:
                      'variadic': variadic,
                      'stack': stack}
 
-        # update function in stack
-        if stack not in self.funcs:
-            self.funcs[stack] = {}
-        self.funcs[stack][func.__name__] = func_meta
+        return func_meta
 
     def add_cli(self, cli_obj):
         """adds a cli object to the stack"""
@@ -51,8 +68,28 @@ class Stack:
 
     def get_stack(self, stack: str) -> dict:
         """retrieve functions from specific stack"""
+        pending = self.pending.pop(stack, None)
+        if pending:
+            funcs = self.funcs.setdefault(stack, {})
+            for name, func in pending.items():
+                funcs[name] = self._materialize(stack, func)
         return self.funcs.get(stack, {})
 
+    def _materialize(self, stack: str, func) -> dict:
+        """meta info of a function from the spec cache, or by introspection"""
+        if self.specs is None:
+            return self.introspect(stack, func)
+
+        source = spec_handler.source_file(func)
+        spec = self.specs.get(stack, func.__name__, source) if source else None
+        if spec is not None:
+            return spec_handler.from_spec(spec, func, stack)
+
+        # cache miss, introspect and store the spec with its help description
+        func_meta = self.introspect(stack, func)
+        self.specs.put(func_meta, CLI.describe(func, func_meta['types']))
+        return func_meta
+
     @staticmethod
     def _get_defaults(func):
         """helper function to collect default func args"""
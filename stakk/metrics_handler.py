@@ -0,0 +1,145 @@
+import os, bisect, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+class Metrics:
+    """openmetrics exposition of benchy latencies, call and error counts"""
+
+    def __init__(self, benchy, buckets=BUCKETS, prefix: str = 'stakk'):
+        """init metrics sink
+
+        :param benchy: benchy instance exposed
+        :param buckets: upper bounds of the latency histogram buckets in seconds
+        :param prefix: prefix of the metric names
+        """
+        self.benchy = benchy
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.histograms = {}  # function name -> [bucket counts..., +Inf count, sum]
+        self.errors = {}  # calls which raised by function name, counted while attached like calls
+        self._lock = threading.Lock()
+        self.port = None  # port of the http server once serving
+        self._server = None
+        self._writer = None
+        self._stop = threading.Event()
+
+    def put(self, name: str, record: dict):
+        """fold a record into the histogram of its function, a bisect and an add on the recording path"""
+        value, weight = record['benchmark'], record.get('weight', 1)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [0] * (len(self.buckets) + 2)
+            histogram[index] += weight
+            histogram[-1] += value * weight
+
+    def error(self, name: str):
+        """count a call which raised"""
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def render(self) -> str:
+        """format every metric as openmetrics text"""
+        with self._lock:
+            histograms = {name: list(histogram) for name, histogram in self.histograms.items()}
+            errors = dict(self.errors)
+        names = sorted(set(histograms) | set(errors))
+        duration, calls, failed = (f'{self.prefix}_call_duration_seconds', f'{self.prefix}_calls',
+                                   f'{self.prefix}_errors')
+
+        lines = [f'# TYPE {duration} histogram', f'# UNIT {duration} seconds',
+                 f'# HELP {duration} latency of benchmarked calls.']
+        for name in names:
+            histogram = histograms.get(name) or [0] * (len(self.buckets) + 2)
+            label = f'function="{escape(name)}"'
+
+            # bucket counts are cumulative
+            count = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), histogram):
+                count += bucket
+                lines.append(f'{duration}_bucket{{{label},le="{bound}"}} {round(count)}')
+            lines.append(f'{duration}_count{{{label}}} {round(count)}')
+            lines.append(f'{duration}_sum{{{label}}} {histogram[-1]}')
+
+        lines += [f'# TYPE {calls} counter', f'# HELP {calls} completed benchmarked calls.']
+        for name in names:
+            histogram = histograms.get(name)
+            lines.append(f'{calls}_total{{function="{escape(name)}"}} {round(sum(histogram[:-1])) if histogram else 0}')
+
+        lines += [f'# TYPE {failed} counter', f'# HELP {failed} benchmarked calls which raised.']
+        for name in names:
+            lines.append(f'{failed}_total{{function="{escape(name)}"}} {errors.get(name, 0)}')
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9464, host: str = '127.0.0.1'):
+        """serve metrics over http from a background thread, port 0 picks a free port
+
+        :param port: port to listen on
+        :param host: interface to bind, localhost by default
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep scrapes out of stderr
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='stakk-metrics', daemon=True).start()
+        return self.port
+
+    def write(self, path: str):
+        """write metrics to a textfile collector path, replacing it atomically"""
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp, path)
+
+    def write_every(self, path: str, interval: float = 15.0):
+        """write metrics to a textfile collector path from a background thread
+
+        :param path: file read by the textfile collector, e.g. `*.prom`
+        :param interval: seconds between writes
+        """
+        def run():
+            while not self._stop.wait(interval):
+                self.write(path)
+
+        self.write(path)
+        self._writer = threading.Thread(target=run, name='stakk-metrics-writer', daemon=True)
+        self._writer.start()
+
+    def close(self):
+        """stop recording, the http server and textfile writer"""
+        if self in self.benchy.sinks:
+            self.benchy.sinks.remove(self)
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+
+def escape(value: str) -> str:
+    """escape a label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
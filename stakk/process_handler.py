@@ -0,0 +1,51 @@
+import os, queue, threading
+from multiprocessing import util
+
+class Publisher:
+    """background thread publishing a worker's benchy aggregates to the parent process"""
+
+    def __init__(self, benchy, channel, interval: float = 1.0):
+        """start publishing
+
+        :param benchy: benchy instance of the worker process
+        :param channel: queue created by `Benchy.collect` in the parent process
+        :param interval: seconds between published deltas
+        """
+        self.benchy = benchy
+        self.channel = channel
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stakk-publisher', daemon=True)
+        self._thread.start()
+
+        # publish the last delta when the worker exits, before the queue is closed
+        self._finalizer = util.Finalize(self, self.close, exitpriority=100)
+
+    def publish(self):
+        """send aggregates recorded since the last publish"""
+        deltas = self.benchy.take_deltas()
+        if deltas:
+            self.channel.put((self.pid, deltas))
+
+    def close(self):
+        """stop the publisher thread and send the remaining delta"""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self.publish()
+
+    def _run(self):
+        """publisher thread loop"""
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+
+def receive(channel):
+    """collect every (pid, deltas) message waiting on a channel without blocking"""
+    messages = []
+    while True:
+        try:
+            messages.append(channel.get_nowait())
+        except queue.Empty:
+            return messages
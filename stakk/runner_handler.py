@@ -0,0 +1,211 @@
+import gc, math, time, asyncio, itertools, statistics
+from stakk.spec_handler import LazyFunc
+
+class Runner:
+    """statistical benchmark runner for the functions of a stack"""
+
+    def __init__(self, warmup: int = 1, rounds: int = 10, min_time: float = 0.05,
+                 disable_gc: bool = False, confidence: float = 0.95):
+        """init runner settings
+
+        :param warmup: rounds to run and discard before measuring
+        :param rounds: measured rounds per function
+        :param min_time: minimum duration of a round, used to calibrate the loop count
+        :param disable_gc: disable the garbage collector while measuring
+        :param confidence: confidence level of the reported interval
+        """
+        self.warmup = warmup
+        self.rounds = rounds
+        self.min_time = min_time
+        self.disable_gc = disable_gc
+        self.confidence = confidence
+        self.loop = None
+
+    def run(self, func_dict: dict, args: dict = None) -> dict:
+        """benchmark every function of a stack
+
+        :param func_dict: registered functions of a stack
+        :param args: argument sets by function name, a list of argument sets or a single one,
+            an argument set is a tuple of positional args or a dict of keyword args
+        :return: results keyed by function name, or `name[i]` for the
+            i-th argument set of functions given several
+        """
+        args = args or {}
+        results = {}
+        self.loop = asyncio.new_event_loop()
+        try:
+            for func_name, items in func_dict.items():
+                func = items['func']
+                if isinstance(func, LazyFunc):
+                    func = func.resolve()
+                arg_sets = args.get(func_name, [()])
+                if isinstance(arg_sets, (tuple, dict)):
+                    arg_sets = [arg_sets]  # a single argument set
+                for i, arg_set in enumerate(arg_sets):
+                    case = func_name if len(arg_sets) == 1 else f'{func_name}[{i}]'
+                    if isinstance(arg_set, dict):
+                        results[case] = self.bench(func, kwargs=arg_set)
+                    else:
+                        results[case] = self.bench(func, tuple(arg_set))
+        finally:
+            self.loop.close()
+            self.loop = None
+        return results
+
+    def bench(self, func, args: tuple = (), kwargs: dict = None) -> dict:
+        """benchmark a single function with one argument set"""
+        kwargs = kwargs or {}
+
+        # reuse the event loop of a run, or own one for a single benchmark
+        own_loop = self.loop is None
+        if own_loop:
+            self.loop = asyncio.new_event_loop()
+        timer = self._timer(func, args, kwargs)
+
+        gc_enabled = gc.isenabled()
+        if self.disable_gc:
+            gc.disable()
+        try:
+            loops = self.calibrate(timer)
+            for _ in range(self.warmup):
+                timer(loops)
+            timings = [timer(loops) / loops for _ in range(self.rounds)]
+        finally:
+            if gc_enabled:
+                gc.enable()
+            if own_loop:
+                self.loop.close()
+                self.loop = None
+
+        return self.summarize(timings, loops)
+
+    def latency(self, func, runs: int, args: tuple = (), kwargs: dict = None) -> dict:
+        """time single calls of a function after `warmup` calls, for latency percentiles
+
+        :param func: function to call
+        :param runs: measured calls
+        :param args: positional args of every call
+        :param kwargs: keyword args of every call
+        """
+        kwargs = kwargs or {}
+        perf_counter = time.perf_counter
+
+        if asyncio.iscoroutinefunction(func):
+            async def timed(count):
+                timings = []
+                for _ in itertools.repeat(None, count):
+                    start_time = perf_counter()
+                    await func(*args, **kwargs)
+                    timings.append(perf_counter() - start_time)
+                return timings
+
+            # reuse one event loop for every call
+            own_loop = self.loop is None
+            if own_loop:
+                self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(timed(self.warmup))
+                start_time = perf_counter()
+                timings = self.loop.run_until_complete(timed(runs))
+                elapsed_time = perf_counter() - start_time
+            finally:
+                if own_loop:
+                    self.loop.close()
+                    self.loop = None
+        else:
+            for _ in itertools.repeat(None, self.warmup):
+                func(*args, **kwargs)
+            timings = []
+            start_time = perf_counter()
+            for _ in itertools.repeat(None, runs):
+                call_time = perf_counter()
+                func(*args, **kwargs)
+                timings.append(perf_counter() - call_time)
+            elapsed_time = perf_counter() - start_time
+
+        ordered = sorted(timings)
+        return {
+            'runs': runs,
+            'warmup': self.warmup,
+            'min': ordered[0],
+            'p50': self.percentile(ordered, 0.5),
+            'p90': self.percentile(ordered, 0.9),
+            'p99': self.percentile(ordered, 0.99),
+            'max': ordered[-1],
+            'mean': statistics.mean(timings),
+            'throughput': runs / elapsed_time if elapsed_time else None,
+        }
+
+    def calibrate(self, timer) -> int:
+        """find a loop count where a round takes at least min_time (like timeit)"""
+        loops = 1
+        while True:
+            for factor in (1, 2, 5):
+                number = loops * factor
+                if timer(number) >= self.min_time:
+                    return number
+            loops *= 10
+
+    def summarize(self, timings: list, loops: int) -> dict:
+        """summarize per call timings of every round"""
+        count = len(timings)
+        mean = statistics.mean(timings)
+        stdev = statistics.stdev(timings) if count > 1 else 0.0
+
+        # confidence interval of the mean
+        margin = self.t_value(self.confidence, count - 1) * stdev / math.sqrt(count) if count > 1 else 0.0
+
+        # tukey fences on the interquartile range
+        ordered = sorted(timings)
+        q1, q3 = self.percentile(ordered, 0.25), self.percentile(ordered, 0.75)
+        iqr = q3 - q1
+        outliers = sum(1 for t in timings if t < q1 - 1.5 * iqr or t > q3 + 1.5 * iqr)
+
+        return {
+            'loops': loops,
+            'rounds': count,
+            'mean': mean,
+            'median': statistics.median(timings),
+            'stdev': stdev,
+            'min': ordered[0],
+            'max': ordered[-1],
+            'ci': (mean - margin, mean + margin),
+            'outliers': outliers,
+            'timings': timings,
+        }
+
+    @staticmethod
+    def percentile(ordered: list, q: float) -> float:
+        """linear interpolated percentile of sorted values"""
+        position = (len(ordered) - 1) * q
+        low = math.floor(position)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    @staticmethod
+    def t_value(confidence: float, df: int) -> float:
+        """two sided student t quantile (cornish-fisher expansion of the normal quantile)"""
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        return (z + (z ** 3 + z) / (4 * df)
+                + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+                + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+    def _timer(self, func, args, kwargs):
+        """build a timer returning the duration of n calls"""
+        if asyncio.iscoroutinefunction(func):
+            async def timed(loops):
+                start_time = time.perf_counter()
+                for _ in itertools.repeat(None, loops):
+                    await func(*args, **kwargs)
+                return time.perf_counter() - start_time
+
+            # reuse one event loop for every round
+            def timer(loops):
+                return self.loop.run_until_complete(timed(loops))
+        else:
+            def timer(loops):
+                start_time = time.perf_counter()
+                for _ in itertools.repeat(None, loops):
+                    func(*args, **kwargs)
+                return time.perf_counter() - start_time
+        return timer
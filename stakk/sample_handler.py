@@ -0,0 +1,84 @@
+import math, time, random, threading
+
+class Sampler:
+    """decides which calls of a function are recorded and the weight of each sample"""
+
+    def __init__(self, policy, budget: float = 1000.0, window: float = 1.0):
+        """init sampling policy
+
+        :param policy: record 1 in `policy` calls given an int, each call with
+            probability `policy` given a float, or 'adaptive'
+        :param budget: recorded calls per second targeted by the adaptive policy
+        :param window: seconds between adaptive rate adjustments
+        """
+        if policy == 'adaptive':
+            self.every = 1
+        elif isinstance(policy, bool) or not isinstance(policy, (int, float)):
+            raise ValueError("sample must be an int, a float probability or 'adaptive'")
+        elif isinstance(policy, int):
+            if policy < 1:
+                raise ValueError("sample interval must be a positive integer")
+            self.every = policy
+        elif not 0 < policy <= 1:
+            raise ValueError("sample probability must be in (0, 1]")
+        self.policy = policy
+        self.budget = budget
+        self.window = window
+        self._calls = 0  # calls seen, sampled or not
+        self._lock = threading.Lock()
+        self._random = random.random
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+
+        # `take` returns the weight of the current call, 0 when it is not sampled
+        if policy == 'adaptive':
+            self.take = self._adaptive
+        elif isinstance(policy, int):
+            self.take = self._fixed
+        else:
+            self.take = self._probabilistic
+
+    @property
+    def calls(self) -> int:
+        """exact number of calls seen, sampled or not"""
+        return self._calls
+
+    def _count(self) -> int:
+        """count a call and return its number"""
+        with self._lock:
+            self._calls += 1
+            return self._calls
+
+    def _fixed(self):
+        """record 1 in n calls with weight n"""
+        if self._count() % self.every:
+            return 0
+        return self.every
+
+    def _probabilistic(self):
+        """record calls with probability p and weight 1 / p"""
+        self._count()
+        if self._random() < self.policy:
+            return 1 / self.policy
+        return 0
+
+    def _adaptive(self):
+        """record 1 in n calls, n follows the call rate so it grows past the budget and shrinks back"""
+        with self._lock:
+            self._calls += 1
+            count = self._calls
+
+            # adjust the interval once per window from the observed call rate, checked on every
+            # call so the interval recovers once traffic drops
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                rate = (count - self._window_calls) / elapsed
+                self.every = max(1, math.ceil(rate / self.budget))
+                self._window_start = now
+                self._window_calls = count
+            every = self.every
+
+        if count % every:
+            return 0
+        return every
@@ -0,0 +1,252 @@
+import os, sys, ast, json, inspect, builtins, importlib
+
+class SpecCache:
+    """on-disk cache of command specs, entries are fingerprinted by source file and stakk version"""
+
+    def __init__(self, path: str):
+        """load the cache file if it was written by this stakk version
+
+        :param path: cache file, usually next to the cli script
+        """
+        from stakk import __version__
+
+        self.path = path
+        self.version = __version__
+        self.entries = {}  # 'stack:name' -> {'source', 'mtime', 'spec'}
+        self.dirty = False
+        self._mtimes = {}  # source path -> mtime, stat once per run
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('stakk') == self.version:
+                self.entries = data.get('commands', {})
+        except (OSError, ValueError):
+            pass  # missing or corrupt cache, rebuild it
+
+    def mtime(self, source):
+        """modification time of a source file, None if it can't be read"""
+        if source not in self._mtimes:
+            try:
+                self._mtimes[source] = os.stat(source).st_mtime_ns
+            except OSError:
+                self._mtimes[source] = None
+        return self._mtimes[source]
+
+    def get(self, stack: str, name: str, source: str = None):
+        """cached spec of a command, None if missing or its source changed
+
+        :param stack: stack identifier of the command
+        :param name: command name
+        :param source: source file of the command, the cached source if omitted
+        """
+        entry = self.entries.get(f'{stack}:{name}')
+        if entry is None:
+            return None
+        source = source or entry['source']
+        if entry['source'] != source or self.mtime(source) != entry['mtime']:
+            return None
+        return entry['spec']
+
+    def put(self, func_meta: dict, description: str = None):
+        """cache the spec of a command, uncacheable commands are skipped
+
+        :param func_meta: registered function meta info of the command
+        :param description: formatted signature shown in the command help
+        """
+        func = func_meta['func']
+        source = source_file(func)
+        spec = to_spec(func_meta, description)
+        if source is None or spec is None or self.mtime(source) is None:
+            return
+        self.entries[f"{func_meta['stack']}:{func.__name__}"] = {
+            'source': source, 'mtime': self.mtime(source), 'spec': spec,
+        }
+        self.dirty = True
+
+    def description(self, stack: str, name: str):
+        """cached help description of a command"""
+        spec = self.get(stack, name)
+        return None if spec is None else spec.get('description')
+
+    def save(self):
+        """write the cache if it changed, read-only locations are skipped"""
+        if not self.dirty:
+            return
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump({'stakk': self.version, 'commands': self.entries}, f)
+            os.replace(temp, self.path)
+            self.dirty = False
+        except OSError:
+            pass
+
+
+class LazyFunc:
+    """command registered by dotted path, its module is only imported when it runs"""
+
+    # builtin types an annotation may name without importing the module
+    types = {'str', 'int', 'float', 'bool', 'complex', 'bytes', 'list', 'tuple', 'dict', 'set'}
+
+    def __init__(self, target: str):
+        """init lazy reference
+
+        :param target: 'package.module:function'
+        """
+        module, sep, name = target.partition(':')
+        if not sep or not module or not name.isidentifier():
+            raise ValueError(f"lazy target must look like 'package.module:function', got {target!r}")
+        self.module = module
+        self.__name__ = self.__qualname__ = name
+        self.source = find_source(module)
+        self._func = None
+        self._parsed = None
+
+    def resolve(self):
+        """import the module and return the function"""
+        if self._func is None:
+            self._func = getattr(importlib.import_module(self.module), self.__name__)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def parse(self):
+        """signature and docstring from the module source, imported when the source can't answer"""
+        if self._parsed is None:
+            try:
+                self._parsed = parse_function(self.source, self.__name__)
+            except (OSError, TypeError, ValueError, SyntaxError):
+                func = self.resolve()
+                self._parsed = inspect.signature(func), func.__doc__
+        return self._parsed
+
+    # read by introspection in place of the function's own attributes
+    __signature__ = property(lambda self: self.parse()[0])
+    __doc__ = property(lambda self: self.parse()[1])
+
+
+def find_source(module: str):
+    """source file of a module found on sys.path without importing it or its packages"""
+    parts = module.split('.')
+    for entry in sys.path:
+        base = os.path.join(entry or os.getcwd(), *parts)
+        for path in (f'{base}.py', os.path.join(base, '__init__.py')):
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+    return None
+
+
+def parse_function(source: str, name: str):
+    """signature and docstring of a top level function parsed with ast
+
+    raises ValueError for annotations or defaults that need the module to evaluate
+    """
+    with open(source, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), source)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            break
+    else:
+        raise ValueError(f"no top level function {name!r} in {source}")
+
+    args = node.args
+    if args.kwonlyargs:
+        raise ValueError("keyword only arguments need introspection")
+    empty, kind = inspect.Parameter.empty, inspect.Parameter
+    params = []
+
+    # positional args, defaults align with the last ones
+    positional = getattr(args, 'posonlyargs', []) + args.args
+    defaults = [empty] * (len(positional) - len(args.defaults)) + [ast.literal_eval(d) for d in args.defaults]
+    for arg, default in zip(positional, defaults):
+        params.append(kind(arg.arg, kind.POSITIONAL_OR_KEYWORD, default=default,
+                           annotation=parse_annotation(arg.annotation)))
+
+    # variadic args can't be annotated for the cli
+    for arg, arg_kind in ((args.vararg, kind.VAR_POSITIONAL), (args.kwarg, kind.VAR_KEYWORD)):
+        if arg is not None:
+            if arg.annotation is not None:
+                raise ValueError("annotated variadic arguments need introspection")
+            params.append(kind(arg.arg, arg_kind))
+
+    # docstrings are dedented by the compiler from python 3.13
+    doc = ast.get_docstring(node, clean=sys.version_info >= (3, 13))
+    return inspect.Signature(params, return_annotation=parse_annotation(node.returns)), doc
+
+
+def parse_annotation(node):
+    """evaluate an annotation naming a builtin type or a literal choices list"""
+    if node is None:
+        return inspect.Parameter.empty
+    if isinstance(node, ast.Name) and node.id in LazyFunc.types:
+        return getattr(builtins, node.id)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return ast.literal_eval(node)
+    raise ValueError(f"annotation {ast.dump(node)} needs introspection")
+
+
+def source_file(func):
+    """absolute source file of a function, None for functions without one"""
+    if isinstance(func, LazyFunc):
+        return func.source
+    code = getattr(func, '__code__', None)
+    if code is None or not os.path.isfile(code.co_filename):
+        return None
+    return os.path.abspath(code.co_filename)
+
+
+def plain(value) -> bool:
+    """check if a value survives a json round trip unchanged"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if type(value) is list:
+        return all(plain(item) for item in value)
+    return False
+
+
+def encode_type(annotation):
+    """serialize an annotation, None when it can't be cached safely"""
+    if isinstance(annotation, type) and annotation.__module__ == 'builtins':
+        return {'type': annotation.__name__}
+    if isinstance(annotation, (list, tuple)) and all(plain(item) and type(item) is not list for item in annotation):
+        return {'choices': list(annotation), 'container': type(annotation).__name__}
+    return None  # custom callables need introspection
+
+
+def decode_type(data):
+    """rebuild a serialized annotation"""
+    if 'type' in data:
+        return getattr(builtins, data['type'])
+    return tuple(data['choices']) if data['container'] == 'tuple' else list(data['choices'])
+
+
+def to_spec(func_meta: dict, description: str = None):
+    """serializable spec of a command, None if an annotation or default can't be cached"""
+    types = {}
+    for name, annotation in func_meta['types'].items():
+        types[name] = encode_type(annotation)
+        if types[name] is None:
+            return None
+    if not all(plain(value) for value in func_meta['defaults'].values()):
+        return None
+    return {
+        'names': func_meta['names'],
+        'types': types,
+        'defaults': func_meta['defaults'],
+        'desc': func_meta['desc'],
+        'variadic': func_meta['variadic'],
+        'description': description,
+    }
+
+
+def from_spec(spec: dict, func, stack: str) -> dict:
+    """function meta info of a command rebuilt from its cached spec"""
+    return {'func': func,
+            'names': list(spec['names']),
+            'types': {name: decode_type(data) for name, data in spec['types'].items()},
+            'defaults': dict(spec['defaults']),
+            'desc': spec['desc'],
+            'variadic': spec['variadic'],
+            'stack': stack}
@@ -0,0 +1,137 @@
+import math
+
+class Sketch:
+    """mergeable log-bucketed quantile sketch with bounded relative error"""
+
+    def __init__(self, accuracy: float = 0.01, max_buckets: int = 2048):
+        """init empty sketch
+
+        :param accuracy: relative accuracy of estimated quantiles
+        :param max_buckets: upper bound on stored buckets, lowest buckets collapse past it
+        """
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}  # bucket index -> count
+        self.zeros = 0  # values too small to bucket
+        self.count = 0
+
+    def add(self, value, weight=1):
+        """add a value to the sketch, weighted for sampled values"""
+        if value <= 0:
+            self.zeros += weight
+        else:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        self.count += weight
+
+    def merge(self, other):
+        """merge another sketch with the same accuracy into this sketch"""
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float):
+        """estimate the value at quantile q (0 <= q <= 1)"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # midpoint of the bucket (gamma^(k-1), gamma^k]
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def _collapse(self):
+        """fold the lowest buckets together to respect max_buckets"""
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        folded = sum(self.buckets.pop(key) for key in keys[:excess])
+        target = keys[excess]
+        self.buckets[target] += folded
+
+
+class Stats:
+    """constant memory running statistics for a benchmarked function"""
+
+    quantiles = (0.5, 0.9, 0.99)
+
+    def __init__(self, accuracy: float = 0.01):
+        """init empty statistics
+
+        :param accuracy: relative accuracy of the quantile sketch
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean (welford)
+        self.min = None
+        self.max = None
+        self.sketch = Sketch(accuracy)
+
+    def add(self, value, weight=1):
+        """add a single benchmark value, weighted for sampled values"""
+        self.count += weight
+        delta = value - self.mean
+        self.mean += delta * weight / self.count
+        self.m2 += weight * delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.sketch.add(value, weight)
+
+    def append(self, record):
+        """add a call record, only the benchmark and weight are kept"""
+        self.add(record['benchmark'], record.get('weight', 1))
+
+    def merge(self, other):
+        """merge another stats object into this one (chan et al.)"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """sample variance of collected values"""
+        if self.count <= 1:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    def summary(self) -> dict:
+        """summarize collected statistics"""
+        summary = {
+            'count': self.count,
+            'total': self.mean * self.count,
+            'mean': self.mean,
+            'stdev': math.sqrt(self.variance),
+            'min': self.min,
+            'max': self.max,
+        }
+        for q in self.quantiles:
+            summary[f'p{round(q * 100)}'] = self.sketch.quantile(q)
+        return summary
+
+    def __len__(self):
+        return round(self.count)
+
+    def __repr__(self):
+        return repr(self.summary())
@@ -0,0 +1,225 @@
+import math
+import heapq
+import random
+import itertools
+import threading
+from array import array
+from stakk.stats_handler import Sketch
+
+class Ring:
+    """fixed size ring buffer keeping the most recent call records"""
+
+    def __init__(self, size: int):
+        """init preallocated ring buffer
+
+        :param size: number of records to keep
+        """
+        if size < 1:
+            raise ValueError("size must be a positive integer")
+        self.size = size
+        self.items = [None] * size  # preallocated slots
+        self.seen = 0  # total records appended
+
+    def append(self, record):
+        """overwrite the oldest slot with a record"""
+        self.items[self.seen % self.size] = record
+        self.seen += 1
+
+    def __len__(self):
+        return min(self.seen, self.size)
+
+    def __iter__(self):
+        """iterate records from oldest to newest"""
+        if self.seen <= self.size:
+            return iter(self.items[:self.seen])
+        start = self.seen % self.size
+        return iter(self.items[start:] + self.items[:start])
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Reservoir(Ring):
+    """uniform random sample of call records over the process lifetime"""
+
+    def __init__(self, size: int, seed=None):
+        """init preallocated reservoir
+
+        :param size: number of records to keep
+        :param seed: optional seed for reproducible sampling
+        """
+        super().__init__(size)
+        self.random = random.Random(seed)
+
+    def append(self, record):
+        """sample a record into the reservoir (algorithm r)"""
+        if self.seen < self.size:
+            self.items[self.seen] = record
+        else:
+            slot = self.random.randrange(self.seen + 1)
+            if slot < self.size:
+                self.items[slot] = record
+        self.seen += 1
+
+    def __iter__(self):
+        """iterate sampled records, order is not meaningful"""
+        return iter(self.items[:len(self)])
+
+
+class Columns:
+    """columnar call record store backed by typed arrays"""
+
+    # array typecode -> numpy dtype
+    dtypes = {'q': 'int64', 'd': 'float64'}
+
+    def __init__(self):
+        """init empty columns"""
+        self.types = []  # interned type names, the type id is the index
+        self.type_ids = {}
+        self.columns = {'seq': array('q'), 'benchmark': array('d')}
+        self.rows = 0
+
+    def type_id(self, name):
+        """intern a type name and return its id"""
+        if name not in self.type_ids:
+            self.type_ids[name] = len(self.types)
+            self.types.append(name)
+        return self.type_ids[name]
+
+    def append(self, record):
+        """append a call record as a row"""
+        row = self.rows
+        self._append('seq', 'q', record.get('seq', row))
+        self._append('benchmark', 'd', record['benchmark'])
+        if 'exclusive' in record:
+            self._append('exclusive', 'd', record['exclusive'])
+
+        # collect summary fields, one column group per arg position and kwarg
+        fields = {'result': record.get('result')}
+        for i, summary in enumerate(record.get('args') or ()):
+            fields[f'arg{i}'] = summary
+        for key, summary in (record.get('kwargs') or {}).items():
+            fields[f'kwarg.{key}'] = summary
+
+        for field, summary in fields.items():
+            if summary is None:
+                continue
+            value = summary.get('value')
+            if not isinstance(value, (int, float)):
+                value = float('nan')
+            self._append(f'{field}.type', 'q', self.type_id(summary['type']))
+            self._append(f'{field}.length', 'q', summary.get('length', -1))
+            self._append(f'{field}.value', 'd', value)
+            if 'nbytes' in summary:
+                self._append(f'{field}.nbytes', 'q', summary['nbytes'])
+
+        self.rows += 1
+
+        # pad columns which were not part of this record
+        for name, column in self.columns.items():
+            if len(column) == row:
+                self._append(name, column.typecode, self._missing(column.typecode))
+
+    def _append(self, name, typecode, value):
+        """append a value to a column, creating and backfilling it if new"""
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = array(typecode, [self._missing(typecode)] * self.rows)
+        try:
+            column.append(value)
+        except BufferError:
+            # exported views pin the array, copy on write and leave the view as a snapshot
+            column = self.columns[name] = array(typecode, column)
+            column.append(value)
+
+    @staticmethod
+    def _missing(typecode):
+        """fill value for a row without data"""
+        return float('nan') if typecode == 'd' else -1
+
+    def to_numpy(self) -> dict:
+        """zero-copy export of every column as a numpy array"""
+        import numpy as np
+
+        return {name: np.frombuffer(column, dtype=self.dtypes[column.typecode])
+                for name, column in self.columns.items()}
+
+    def to_dataframe(self):
+        """build a pandas dataframe, type id columns become categoricals"""
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("to_dataframe requires pandas, install it with `pip install pandas`") from e
+
+        data = self.to_numpy()
+        for name in data:
+            if name.endswith('.type'):
+                data[name] = pd.Categorical.from_codes(data[name], categories=self.types)
+        return pd.DataFrame(data)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __repr__(self):
+        return f"Columns(rows={self.rows}, columns={list(self.columns)})"
+
+
+class Tail:
+    """live latency sketch and bounded heap of the slowest calls of a function"""
+
+    def __init__(self, threshold, slowest: int = 10, warmup: int = 100, refresh: int = 256):
+        """init tail capture
+
+        :param threshold: fixed threshold in seconds, or a quantile such as 'p99'
+        :param slowest: number of slowest call records to keep
+        :param warmup: calls observed before a quantile threshold applies
+        :param refresh: calls between quantile threshold updates
+        """
+        if isinstance(threshold, str):
+            if not threshold.startswith('p') or not 0 < float(threshold[1:]) < 100:
+                raise ValueError("tail quantile must look like 'p99'")
+            self.quantile = float(threshold[1:]) / 100
+            self.threshold = math.inf  # no captures until warmed up
+        elif isinstance(threshold, (int, float)) and not isinstance(threshold, bool) and threshold >= 0:
+            self.quantile = None
+            self.threshold = threshold
+        else:
+            raise ValueError("tail must be a threshold in seconds or a quantile such as 'p99'")
+        if slowest < 1:
+            raise ValueError("slowest must be a positive integer")
+        self.slowest = slowest
+        self.warmup = warmup
+        self.refresh = refresh
+        self.sketch = Sketch()
+        self.heap = []  # min heap of (benchmark, sequence, record)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_time) -> bool:
+        """add a call timing to the sketch, True when the call should be captured"""
+        sketch = self.sketch
+        sketch.add(elapsed_time)
+        count = sketch.count
+        if self.quantile is not None and (count == self.warmup or count > self.warmup and not count % self.refresh):
+            self.threshold = sketch.quantile(self.quantile)
+        return elapsed_time > self.threshold
+
+    def capture(self, record):
+        """keep a full record if it is among the slowest calls"""
+        item = (record['benchmark'], next(self._sequence), record)
+        with self._lock:
+            if len(self.heap) < self.slowest:
+                heapq.heappush(self.heap, item)
+            elif item[0] > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+
+    def records(self) -> list:
+        """captured records, slowest first"""
+        with self._lock:
+            return [record for _, _, record in sorted(self.heap, reverse=True)]
@@ -0,0 +1,106 @@
+class Summarizers:
+    """type keyed registry of arg / result summarizers, resolved once per type"""
+
+    def __init__(self):
+        # keys are types or 'module.qualname' strings, optional libraries are never imported
+        self.handlers = {
+            str: sized, bytes: sized, bytearray: sized, list: sized, tuple: sized,
+            dict: sized, set: sized, frozenset: sized, memoryview: buffer,
+            'numpy.ndarray': array,
+            'numpy.generic': scalar,
+            'pandas.DataFrame': frame,  # pandas 3 exports classes from the top level module
+            'pandas.Series': series,
+            'pandas.core.frame.DataFrame': frame,
+            'pandas.core.series.Series': series,
+        }
+        self._cache = {}  # type -> resolved handler
+
+    def register(self, key, handler=None):
+        """register a summarizer for a type or a 'module.qualname' string, usable as a decorator
+
+        :param key: type summarized, subclasses included
+        :param handler: function taking the data and returning a summary dict with a 'type'
+        """
+        if handler is None:
+            return lambda handler: self.register(key, handler)
+        self.handlers[key] = handler
+        self._cache = {}  # subclasses may resolve differently now
+        return handler
+
+    def lookup(self, cls):
+        """resolve the handler of a type along its mro and cache it"""
+        handlers = self.handlers
+        handler = default
+        for base in cls.__mro__:
+            if base in handlers:
+                handler = handlers[base]
+                break
+            name = f'{base.__module__}.{base.__qualname__}'
+            if name in handlers:
+                handler = handlers[name]
+                break
+        self._cache[cls] = handler
+        return handler
+
+    def summarize(self, data) -> dict:
+        """summarize data with the handler of its type"""
+        handler = self._cache.get(data.__class__)
+        if handler is None:
+            handler = self.lookup(data.__class__)
+        return handler(data)
+
+
+def default(data) -> dict:
+    """summarize data by length when sized, by value when not iterable"""
+    if hasattr(data, '__iter__'):
+        # lazy iterables such as generators have no length
+        if hasattr(data, '__len__'):
+            return {'type': type(data).__name__, 'length': len(data)}
+        return {'type': type(data).__name__}
+    else:
+        return {'type': type(data).__name__, 'value': data}
+
+
+def sized(data) -> dict:
+    """summarize a builtin container by length"""
+    return {'type': type(data).__name__, 'length': len(data)}
+
+
+def buffer(data) -> dict:
+    """summarize a memoryview by layout without reading it"""
+    summary = {'type': type(data).__name__, 'shape': list(data.shape), 'dtype': data.format,
+               'nbytes': data.nbytes}
+    if data.ndim:
+        summary['length'] = data.shape[0]
+    return summary
+
+
+def array(data) -> dict:
+    """summarize a numpy array by shape, dtype and size"""
+    summary = {'type': type(data).__name__, 'shape': list(data.shape), 'dtype': str(data.dtype),
+               'nbytes': data.nbytes}
+    if data.ndim:
+        summary['length'] = data.shape[0]
+    return summary
+
+
+def scalar(data) -> dict:
+    """summarize a numpy scalar by its python value"""
+    return {'type': type(data).__name__, 'value': data.item()}
+
+
+def frame(data) -> dict:
+    """summarize a pandas dataframe by shape, column dtypes and size without deep inspection of objects"""
+    return {'type': type(data).__name__, 'length': data.shape[0], 'shape': list(data.shape),
+            'dtypes': {str(column): str(dtype) for column, dtype in data.dtypes.items()},
+            'nbytes': int(data.memory_usage(deep=False).sum())}
+
+
+def series(data) -> dict:
+    """summarize a pandas series by length, dtype and size"""
+    return {'type': type(data).__name__, 'length': data.shape[0], 'shape': list(data.shape),
+            'dtype': str(data.dtype), 'nbytes': data.nbytes}
+
+
+# default registry, used by `Benchy.summarize` outside of an instance
+summarizers = Summarizers()
@@ -0,0 +1,87 @@
+import random
+import pytest
+from stakk import baseline_handler, bench_handler
+
+### Tests
+
+def test_baseline_save_load(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    def func_list(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(aggregate=True)
+    def func_agg(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    for i in range(10):
+        func_list(i)
+        func_agg(i)
+
+    runner_results = {'func_runner': {'timings': [0.1, 0.2]}}
+    baseline_handler.Baseline.from_results(benchy.report, label='v1').save(path)
+    loaded = baseline_handler.Baseline.load(path)
+
+    assert loaded.label == 'v1'
+    assert len(loaded.samples['func_list']) == 10
+    assert len(loaded.samples['func_agg']) == 10
+    assert baseline_handler.Baseline.from_results(runner_results).samples == {'func_runner': [0.1, 0.2]}
+
+
+def test_baseline_weighted_count():
+    benchy = bench_handler.Benchy()
+
+    # probabilistic sampling weights make the aggregated count a float
+    @benchy(sample=0.5, aggregate=True)
+    def func_sampled(x: int) -> int:
+        return x
+
+    for i in range(100):
+        func_sampled(i)
+
+    count = benchy.report['func_sampled'].count
+    assert isinstance(count, float)
+    assert len(baseline_handler.Baseline.from_results(benchy.report).samples['func_sampled']) == int(count)
+
+
+def test_baseline_compare():
+    rng = random.Random(1)
+    base = baseline_handler.Baseline({
+        'same': [rng.gauss(1.0, 0.05) for _ in range(50)],
+        'slower': [rng.gauss(1.0, 0.05) for _ in range(50)],
+        'faster': [rng.gauss(1.0, 0.05) for _ in range(50)],
+    })
+    current = baseline_handler.Baseline({
+        'same': [rng.gauss(1.0, 0.05) for _ in range(50)],
+        'slower': [rng.gauss(1.2, 0.05) for _ in range(50)],
+        'faster': [rng.gauss(0.8, 0.05) for _ in range(50)],
+        'new': [1.0],
+    })
+
+    verdicts = base.compare(current)
+    assert {name: result['verdict'] for name, result in verdicts.items()} == {
+        'same': 'same', 'slower': 'slower', 'faster': 'faster'}
+
+    # slowdown of ~20% fails a 10% threshold but not a 50% threshold
+    assert baseline_handler.check(verdicts, threshold=0.1) == 1
+    assert baseline_handler.check(verdicts, threshold=0.5) == 0
+
+
+def test_baseline_main(tmp_path, capsys):
+    base_path, current_path = str(tmp_path / 'base.json'), str(tmp_path / 'current.json')
+    baseline_handler.Baseline({'func': [1.0 + i * 0.01 for i in range(20)]}).save(base_path)
+    baseline_handler.Baseline({'func': [2.0 + i * 0.01 for i in range(20)]}).save(current_path)
+
+    assert baseline_handler.main([base_path, current_path]) == 1
+    assert 'func: slower' in capsys.readouterr().out
+    assert baseline_handler.main([base_path, base_path]) == 0
+
+
+def test_mann_whitney():
+    # identical samples are not significant, disjoint samples are
+    assert baseline_handler.Baseline.mann_whitney([1, 2, 3], [1, 2, 3]) == pytest.approx(1.0)
+    assert baseline_handler.Baseline.mann_whitney(list(range(20)), list(range(100, 120))) < 0.001
@@ -1,6 +1,8 @@
 import stakk
 from stakk import bench_handler
 import asyncio
+import pytest
+import time
 
 
 ##### Methods
@@ -54,4 +56,544 @@ def test_benchy_and_register():
 
     # clear global registers
     stakk.benchy.report = {}
-    stakk.stack.funcs = {}
\ No newline at end of file
+    stakk.stack.funcs = {}
+
+def test_benchy_aggregate():
+    benchy = bench_handler.Benchy()
+
+    @benchy(aggregate=True)
+    def func_agg(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(aggregate=True)
+    async def async_agg():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    for i in range(1000):
+        func_agg(i)
+    asyncio.get_event_loop().run_until_complete(async_agg())
+
+    summary = benchy.report['func_agg'].summary()
+    assert summary['count'] == 1000
+    assert summary['min'] <= summary['p50'] <= summary['max']
+    assert benchy.report['async_agg'].count == 1
+
+    # memory stays constant, no per call records are kept
+    assert not hasattr(benchy.report['func_agg'], '__iter__')
+
+
+def test_benchy_retain():
+    benchy = bench_handler.Benchy()
+
+    @benchy(retain='ring', size=10)
+    def func_ring(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(retain='reservoir', size=10)
+    def func_reservoir(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    for i in range(100):
+        func_ring(i)
+        func_reservoir(i)
+
+    ring = list(benchy.report['func_ring'])
+    assert len(ring) == 10
+    assert [record['args'][0]['value'] for record in ring] == list(range(90, 100))
+    assert 'benchmark' in ring[0]
+    assert len(benchy.report['func_reservoir']) == 10
+
+    with pytest.raises(ValueError):
+        benchy(retain='unknown')
+    for size in (0, -1, 1.5, None):
+        with pytest.raises(ValueError):
+            benchy(retain='ring', size=size)
+        with pytest.raises(ValueError):
+            benchy.span('block', retain='reservoir', size=size)
+
+
+def test_benchy_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    benchy = bench_handler.Benchy(flush_size=64)
+
+    @benchy
+    def func_list(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(aggregate=True)
+    def func_agg(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    def work(n):
+        for i in range(n):
+            func_list(i)
+            func_agg(i)
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(work, [500] * 32))
+
+    # no records are lost across threads
+    assert len(benchy.report['func_list']) == 500 * 32
+    assert benchy.report['func_agg'].count == 500 * 32
+
+    # finished thread buffers are released after merging
+    assert len(benchy._buffers) <= 1
+
+
+def test_benchy_columnar():
+    benchy = bench_handler.Benchy()
+
+    @benchy(columnar=True)
+    def func_col(x: int, data: list = None) -> int:
+        """this is a test function"""
+        return x
+
+    for i in range(100):
+        func_col(i, data=[i])
+
+    columns = benchy.report['func_col']
+    assert len(columns) == 100
+    assert list(columns['arg0.value']) == list(range(100))
+    assert list(columns['kwarg.data.length']) == [1] * 100
+    assert list(columns['seq']) == sorted(columns['seq'])
+
+    with pytest.raises(ValueError):
+        benchy(columnar=True, aggregate=True)
+
+
+def test_benchy_call_tree():
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    def add(x: int, y: int) -> int:
+        """this is a test function"""
+        return x + y
+
+    @benchy
+    def calc(x: int, y: int) -> int:
+        """this is a test function"""
+        time.sleep(0.01)
+        return add(x, y) + add(x, y)
+
+    @benchy
+    async def async_calc():
+        '''this is a test async function'''
+        return sum(await asyncio.gather(async_add(), async_add()))
+
+    @benchy
+    async def async_add():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+        return add(1, 2)
+
+    calc(1, 2)
+    asyncio.get_event_loop().run_until_complete(async_calc())
+
+    paths = benchy.call_paths()
+    assert paths['calc']['calls'] == 1
+    assert paths['calc;add']['calls'] == 2
+    assert paths['async_calc;async_add;add']['calls'] == 2
+
+    # exclusive time excludes child calls
+    calc_record = benchy.report['calc'][0]
+    children = sum(record['benchmark'] for record in benchy.report['add'] if record['path'] == 'calc;add')
+    assert abs(calc_record['exclusive'] - (calc_record['benchmark'] - children)) < 1e-9
+
+    profile = benchy.call_profile()
+    assert profile['add']['parents'] == {'calc': 2, 'async_add': 2}
+    assert profile['calc']['children'] == {'add': 2}
+    assert profile['add']['calls'] == 4
+
+    lines = benchy.collapsed().splitlines()
+    assert any(line.startswith('calc;add ') for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_benchy_async_timing():
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    async def sleeper():
+        '''this is a test async function'''
+        await asyncio.sleep(0.05)
+        await asyncio.sleep(0.05)
+        return 'slept'
+
+    @benchy
+    async def burner():
+        '''this is a test async function'''
+        end = time.thread_time() + 0.05
+        while time.thread_time() < end:
+            pass
+        return 'burned'
+
+    @benchy
+    async def failer():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+        raise KeyError('fail')
+
+    async def main():
+        assert await sleeper() == 'slept'
+        assert await burner() == 'burned'
+        with pytest.raises(KeyError):
+            await failer()
+        task = asyncio.ensure_future(sleeper())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+    sleep_record = benchy.report['sleeper'][0]
+    assert sleep_record['suspensions'] == 2
+    assert sleep_record['suspended'] >= 0.09
+    assert sleep_record['cpu'] < 0.05
+
+    burn_record = benchy.report['burner'][0]
+    assert burn_record['suspensions'] == 0
+    assert burn_record['cpu'] >= 0.05
+
+    # failed and cancelled calls are not recorded
+    assert len(benchy.report['sleeper']) == 1
+    assert 'failer' not in benchy.report
+
+
+def test_benchy_memory():
+    import tracemalloc
+
+    benchy = bench_handler.Benchy()
+
+    @benchy(memory=True)
+    def allocate(n: int) -> list:
+        """this is a test function"""
+        return [bytearray(1000) for _ in range(n)]
+
+    @benchy(memory=True)
+    async def async_allocate(n: int) -> list:
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+        return [bytearray(1000) for _ in range(n)]
+
+    @benchy(memory=True)
+    def allocate_fails(n: int) -> list:
+        '''this is a test function'''
+        raise MemoryError('test')
+
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        allocate(100)
+        asyncio.get_event_loop().run_until_complete(async_allocate(100))
+        with pytest.raises(MemoryError):
+            allocate_fails(1)
+    finally:
+        benchy.memory.gc_monitor.uninstall()
+        if not was_tracing:
+            tracemalloc.stop()
+
+    # calls which raise stop being measured
+    assert benchy.memory.active == {}
+
+    for name in ('allocate', 'async_allocate'):
+        record = benchy.report[name][0]
+        assert record['memory']['net'] >= 100 * 1000
+        assert record['memory']['peak'] >= record['memory']['net']
+        assert len(record['gc']['collections']) == 3
+    assert 'cpu' in benchy.report['async_allocate'][0]
+
+
+def test_benchy_levels():
+    benchy = bench_handler.Benchy()
+
+    @benchy(level='timing')
+    def func_timing(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(level='types')
+    def func_types(x: int, data: list = None) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(level='timing')
+    async def async_timing():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    @benchy
+    def func_gen():
+        """this is a test function"""
+        return (i for i in range(3))
+
+    func_timing(1)
+    func_types(1, data=[1, 2])
+    func_gen()
+    asyncio.get_event_loop().run_until_complete(async_timing())
+
+    assert list(benchy.report['func_timing'][0]) == ['benchmark']
+    assert benchy.report['func_timing'][0]['benchmark'] > 0
+    assert list(benchy.report['async_timing'][0]) == ['benchmark']
+
+    types_record = benchy.report['func_types'][0]
+    assert types_record['args'] == [{'type': 'int'}]
+    assert types_record['kwargs'] == {'data': {'type': 'list'}}
+    assert types_record['result'] == {'type': 'int'}
+
+    # generators have no length and are summarized by type
+    assert benchy.report['func_gen'][0]['result'] == {'type': 'generator'}
+
+    with pytest.raises(ValueError):
+        benchy(level='unknown')
+    with pytest.raises(ValueError):
+        benchy(level='timing', memory=True)
+
+
+def test_benchy_overhead():
+    benchy = bench_handler.Benchy()
+    overhead = benchy.overhead(loops=1000)
+
+    assert set(overhead) == set(benchy.levels)
+    assert all(value >= 0 for value in overhead.values())
+    assert benchy.report == {}
+
+
+def test_benchy_sampling():
+    benchy = bench_handler.Benchy()
+
+    @benchy(sample=10, aggregate=True)
+    def func_agg(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(sample=4, level='timing')
+    def func_timing(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    @benchy(sample=5)
+    async def async_sampled():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    for i in range(1000):
+        func_agg(i)
+        func_timing(i)
+
+    async def main():
+        for _ in range(20):
+            await async_sampled()
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+    # weighted statistics give the true call count
+    assert benchy.report['func_agg'].count == 1000
+    assert len(benchy.report['func_timing']) == 250
+    assert benchy.report['func_timing'][0]['weight'] == 4
+    assert [record['weight'] for record in benchy.report['async_sampled']] == [5] * 4
+    assert benchy.calls() == {'func_agg': 1000, 'func_timing': 1000, 'async_sampled': 20}
+
+    with pytest.raises(ValueError):
+        benchy(sample=0)
+
+
+def test_benchy_tail():
+    benchy = bench_handler.Benchy()
+
+    @benchy(tail=0.005, slowest=2, stack=True)
+    def func_tail(delay: float) -> float:
+        """this is a test function"""
+        time.sleep(delay)
+        return delay
+
+    @benchy(tail='p99')
+    async def async_tail(delay: float) -> float:
+        '''this is a test async function'''
+        await asyncio.sleep(delay)
+        return delay
+
+    for delay in (0, 0.01, 0, 0.02, 0.03, 0):
+        func_tail(delay)
+    asyncio.get_event_loop().run_until_complete(async_tail(0))
+
+    # every call is timed, slow calls keep full records
+    assert len(benchy.report['func_tail']) == 6
+    assert list(benchy.report['func_tail'][0]) == ['benchmark']
+
+    slowest = benchy.slowest()['func_tail']
+    assert [record['args'][0]['value'] for record in slowest] == [0.03, 0.02]
+    assert slowest[0]['thread'] and slowest[0]['task'] is None
+    assert any('test_benchy_tail' in line for line in slowest[0]['stack'])
+    assert benchy.slowest()['async_tail'] == []
+
+    with pytest.raises(ValueError):
+        benchy(tail='p99', sample=10)
+
+
+def test_benchy_generators():
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    def func_gen(n: int):
+        """this is a test function"""
+        for i in range(n):
+            time.sleep(0.001)
+            received = yield i
+            if received:
+                yield received
+        return 'done'
+
+    @benchy
+    async def async_gen(n: int):
+        '''this is a test async function'''
+        for i in range(n):
+            await asyncio.sleep(0.001)
+            yield i
+
+    # consumer blocks between items
+    items = []
+    for item in func_gen(5):
+        items.append(item)
+        time.sleep(0.002)
+    assert items == [0, 1, 2, 3, 4]
+
+    # send values through and close early
+    gen = func_gen(5)
+    assert next(gen) == 0
+    assert gen.send('echo') == 'echo'
+    gen.close()
+
+    async def consume():
+        return [item async for item in async_gen(3)]
+
+    assert asyncio.get_event_loop().run_until_complete(consume()) == [0, 1, 2]
+
+    record = benchy.report['func_gen'][0]
+    assert record['items'] == 5
+    assert record['result'] == {'type': 'str', 'length': 4}
+    assert record['first_item'] >= 0.001
+    assert record['active'] >= 0.005
+    assert record['blocked'] >= 0.008
+    assert record['interval'] > 0
+    assert record['throughput'] > 0
+
+    # closed generators are recorded with the items produced so far
+    assert benchy.report['func_gen'][1]['items'] == 2
+
+    async_record = benchy.report['async_gen'][0]
+    assert async_record['items'] == 3
+    assert async_record['active'] >= 0.003
+
+
+def test_benchy_generator_options():
+    benchy = bench_handler.Benchy()
+
+    def func_gen(n):
+        yield from range(n)
+
+    async def async_gen(n):
+        yield n
+
+    # options generator wrappers can't honor are rejected
+    for options in ({'sample': 10}, {'tail': 0.0}, {'memory': True}, {'level': 'timing'},
+                    {'clock': 'process_time_ns'}, {'correct': True}):
+        for func in (func_gen, async_gen):
+            with pytest.raises(ValueError):
+                benchy(**options)(func)
+
+    # storage options and the 'types' level apply
+    wrapped = benchy(aggregate=True)(func_gen)
+    wrapped_types = benchy(level='types', retain='ring', size=2)(async_gen)
+    for _ in range(3):
+        assert list(wrapped(3)) == [0, 1, 2]
+
+    async def consume():
+        return [item async for item in wrapped_types(1)]
+
+    for _ in range(3):
+        asyncio.get_event_loop().run_until_complete(consume())
+    assert benchy.report['func_gen'].count == 3
+    assert len(benchy.report['async_gen']) == 2
+    assert benchy.report['async_gen'][0]['args'] == [{'type': 'int'}]
+
+
+def test_benchy_spans():
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    def func_outer():
+        """this is a test function"""
+        with benchy.span('load'):
+            time.sleep(0.002)
+        timer = benchy.span('parse').start()
+        time.sleep(0.001)
+        return timer.stop()
+
+    async def async_block():
+        async with benchy.span('fetch', aggregate=True):
+            await asyncio.sleep(0.001)
+
+    func_outer()
+    func_outer()
+    asyncio.get_event_loop().run_until_complete(async_block())
+
+    # spans join the report and the call tree of the enclosing call
+    assert len(benchy.report['load']) == 2
+    assert benchy.report['load'][0]['benchmark'] >= 0.002
+    assert benchy.report['fetch'].count == 1
+    paths = benchy.call_paths()
+    assert paths['func_outer;load']['calls'] == 2
+    assert paths['func_outer;parse']['calls'] == 2
+    assert paths['func_outer']['exclusive'] < paths['func_outer']['inclusive'] - 0.004
+
+    # released spans are reused
+    span = benchy.span('load')
+    span.start().stop()
+    assert benchy.span('load') is span
+
+    # blocks which raise are counted as errors
+    with pytest.raises(KeyError):
+        with benchy.span('load'):
+            raise KeyError('boom')
+    assert benchy.errors['load'] == 1
+    assert len(benchy.report['load']) == 3
+
+
+def test_benchy_clocks():
+    benchy = bench_handler.Benchy()
+
+    @benchy(clock='thread_time_ns', level='timing')
+    def func_cpu():
+        """this is a test function"""
+        time.sleep(0.01)
+
+    @benchy(correct=True)
+    def func_empty():
+        """this is a test function"""
+
+    func_cpu()
+    for _ in range(100):
+        func_empty()
+
+    # sleeping uses no thread cpu time
+    assert benchy.report['func_cpu'][0]['benchmark'] < 0.005
+
+    # the calibrated overhead is subtracted from every call
+    correction = benchy.calibrate()
+    assert correction == benchy.corrections['perf_counter_ns'] > 0
+    assert min(record['benchmark'] for record in benchy.report['func_empty']) < correction / 1e9
+
+    timers = benchy.timers()
+    assert timers['func_cpu']['clock'] == 'thread_time_ns' and timers['func_cpu']['correction'] == 0.0
+    assert timers['func_empty']['correction'] == correction / 1e9
+    assert timers['func_empty']['resolution'] > 0
+
+    with pytest.raises(ValueError):
+        benchy(clock='time_ns')
@@ -5,6 +5,11 @@ from stakk import cli_handler, meta_handler
 
 #### FIXTURES
 
+def square(x: int) -> int:
+    '''square a number in a process pool worker'''
+    return x * x
+
+
 @pytest.fixture
 def mock_os(monkeypatch):
     mock_os = Mock()
@@ -271,3 +276,324 @@ def test_cli_as_module(mock_os):
     
     assert cli_obj.name == module
 
+
+
+def test_cli_bench(capsys, monkeypatch):
+    calls = []
+
+    def sync_test(x: int):
+        '''this is a test function'''
+        calls.append(x)
+        return 'not printed'
+
+    async def async_test():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, sync_test)
+    stakk.add_func(stack_id, async_test)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+
+    # run the command 50 times after 5 warmup calls
+    monkeypatch.setattr(sys, "argv", ["test", "--bench", "50", "--warmup", "5", "sync_test", "3"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    captured = capsys.readouterr()
+
+    assert calls == [3] * 55
+    assert "sync_test: 50 runs, 5 warmup" in captured.out
+    assert "p99" in captured.out and "calls/s" in captured.out
+    assert "not printed" not in captured.out
+
+    monkeypatch.setattr(sys, "argv", ["test", "--bench", "20", "async_test"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert "async_test: 20 runs, 10 warmup" in capsys.readouterr().out
+
+
+def test_cli_bench_param_names(capsys, monkeypatch):
+    calls = []
+
+    def train(bench: int = 3, warmup: int = 0):
+        '''this is a test function'''
+        calls.append((bench, warmup))
+        return f'trained {bench} {warmup}'
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, train)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+
+    # command parameters named like the meta options don't trigger them
+    monkeypatch.setattr(sys, "argv", ["test", "train"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert capsys.readouterr().out == "trained 3 0\n"
+
+    # and the meta options don't leak into the parameters
+    calls.clear()
+    monkeypatch.setattr(sys, "argv", ["test", "--bench", "4", "--warmup", "1", "train", "--bench", "9"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert "train: 4 runs, 1 warmup" in capsys.readouterr().out
+    assert calls == [(9, 0)] * 5
+
+
+def test_format_time():
+    assert cli_handler.CLI.format_time(2.5) == "2.5 s"
+    assert cli_handler.CLI.format_time(0.0015) == "1.5 ms"
+    assert cli_handler.CLI.format_time(4.2e-8) == "42 ns"
+
+
+def test_lazy_parsers(capsys, monkeypatch):
+    def first(x: int, y: int = 2) -> int:
+        '''add two numbers
+
+        extended description
+        '''
+        return x + y
+
+    def second():
+        pass
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, first)
+    stakk.add_func(stack_id, second)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+    parsers = cli_obj.subparsers.choices
+
+    # top-level help renders from one-line summaries without building parsers
+    help_text = cli_obj.parser.format_help()
+    assert "add two numbers" in help_text and "extended description" not in help_text
+    assert "execute second function" in help_text
+    assert dict.__getitem__(parsers, 'first') is None
+
+    # only the invoked command is built
+    monkeypatch.setattr(sys, "argv", ["test", "first", "1", "--y", "5"])
+    monkeypatch.setattr(sys, "exit", lambda *args: None)
+    cli_obj.parse()
+    assert "6" in capsys.readouterr().out
+    assert dict.__getitem__(parsers, 'first') is not None
+    assert dict.__getitem__(parsers, 'second') is None
+    assert "first(x: int, y: int = 2) -> int" in parsers['first'].format_help()
+
+
+def test_argparse_internals(capsys, monkeypatch):
+    # lazy subparsers rely on private argparse internals, render every path through them
+    def greet(name: str, greeting: str = 'hello') -> str:
+        '''greet a person'''
+        return f'{greeting} {name}'
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, greet)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+    assert isinstance(cli_obj.subparsers._name_parser_map, cli_handler.LazyParsers)
+
+    # top-level help lists the command stub
+    monkeypatch.setattr(sys, "argv", ["test", "--help"])
+    with pytest.raises(SystemExit) as exit_info:
+        cli_obj.parse()
+    out = capsys.readouterr().out
+    assert exit_info.value.code == 0
+    assert "{greet}" in out and "greet a person" in out
+
+    # command help builds the parser with the command prog
+    monkeypatch.setattr(sys, "argv", ["test", "greet", "--help"])
+    with pytest.raises(SystemExit) as exit_info:
+        cli_obj.parse()
+    out = capsys.readouterr().out
+    assert exit_info.value.code == 0
+    assert f"usage: {cli_obj.name} greet" in out and "--greeting" in out
+    assert isinstance(cli_obj.subparsers.choices['greet'], cli_handler.Parser)
+
+    # an invalid command is an argparse error listing the commands
+    monkeypatch.setattr(sys, "argv", ["test", "missing"])
+    with pytest.raises(SystemExit) as exit_info:
+        cli_obj.parse()
+    err = capsys.readouterr().err
+    assert exit_info.value.code == 2
+    assert "invalid choice: 'missing'" in err and "greet" in err
+
+    # and a valid one runs
+    monkeypatch.setattr(sys, "argv", ["test", "greet", "ann", "--greeting", "hi"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert capsys.readouterr().out == "hi ann\n"
+
+
+def test_cli_batch(capsys, monkeypatch, tmp_path):
+    import json
+
+    def add(x: int, y: int = 1) -> int:
+        '''add two numbers'''
+        print('noise')
+        return x + y
+
+    async def echo(*args, **kwargs):
+        '''echo args'''
+        await asyncio.sleep(0)
+        return [args, kwargs]
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, add)
+    stakk.add_func(stack_id, echo)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+
+    batch = tmp_path / 'commands.jsonl'
+    batch.write_text('\n'.join([
+        '["add", "1", "--y", "2"]',
+        '{"id": "a", "argv": ["add", "not-a-number"]}',
+        'echo foo key=value',
+        '',
+        '["add", "1", "0"]',
+        '["missing"]',
+        'add 40 --y 2',
+        'add --help',
+    ]))
+
+    monkeypatch.setattr(sys, "argv", ["test", "--batch", str(batch)])
+    with pytest.raises(SystemExit) as exit_info:
+        cli_obj.parse()
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+
+    # a failing line doesn't abort the batch
+    assert exit_info.value.code == 1
+    assert [record['status'] for record in records] == ['ok', 'error', 'ok', 'error', 'error', 'ok', 'error']
+    assert records[0] == {'line': 1, 'command': 'add', 'status': 'ok', 'result': 3}
+    assert records[1]['id'] == 'a' and 'invalid int value' in records[1]['error']
+    assert records[1]['command'] == 'add' and ' add: error: argument x' in records[1]['error']
+    assert records[4]['command'] is None and 'invalid choice' in records[4]['error']
+    assert records[6]['command'] == 'add' and '--help' in records[6]['error']
+    assert records[2]['result'] == [['foo'], {'key': 'value'}]
+    assert records[3]['line'] == 5 and records[3]['type'] == 'ArgumentError'
+    assert records[5]['result'] == 42
+
+    # printed output stays off the result stream
+    assert 'noise' in captured.err
+
+
+def test_cli_batch_jobs(capsys, monkeypatch, tmp_path):
+    import json, threading, time
+
+    threads = set()
+
+    def wait(seconds: float) -> float:
+        '''sleep then return the seconds'''
+        threads.add(threading.get_ident())
+        time.sleep(seconds)
+        sys.stderr.write('waited\n')
+        return seconds
+
+    async def later(seconds: float) -> float:
+        '''sleep on an event loop'''
+        await asyncio.sleep(seconds)
+        return seconds
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, wait)
+    stakk.add_func(stack_id, later, 'thread')
+    stakk.add_func(stack_id, square, 'process')
+    with pytest.raises(ValueError):
+        stakk.add_func(stack_id, square, 'fiber')
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+    cli_obj.executors = stakk.executors[stack_id]
+    assert cli_obj.executors == {'later': 'thread', 'square': 'process'}
+
+    batch = tmp_path / 'commands.txt'
+    batch.write_text('\n'.join(['wait 0.3', 'wait 0.1', 'later 0.05', 'square 7', 'missing', 'wait 0.0'] * 2))
+
+    def run(*options):
+        monkeypatch.setattr(sys, "argv", ["test", "--batch", str(batch), "--jobs", "4", *options])
+        with pytest.raises(SystemExit) as exit_info:
+            cli_obj.parse()
+        assert exit_info.value.code == 1
+        captured = capsys.readouterr()
+
+        # stderr of commands running while lines are parsed isn't swallowed
+        assert captured.err.count('waited') == 6
+        return [json.loads(line) for line in captured.out.splitlines()]
+
+    # results stream as they complete, the slow first line isn't waited on
+    records = run()
+    assert len(records) == 12
+    assert records[0]['line'] != 1
+    assert sorted(record['line'] for record in records) == list(range(1, 13))
+    assert len(threads) > 1
+
+    results = {record['line']: record.get('result') for record in records}
+    assert results[1] == 0.3 and results[3] == 0.05 and results[4] == 49
+    assert [record['type'] for record in records if record['status'] == 'error'] == ['ArgumentError'] * 2
+
+    # the reorder buffer keeps input order
+    records = run('--ordered')
+    assert [record['line'] for record in records] == list(range(1, 13))
+    assert [record.get('result') for record in records[:4]] == [0.3, 0.1, 0.05, 49]
+
+
+def test_cli_batch_param_name(capsys, monkeypatch):
+    def load(batch: str):
+        '''this is a test function'''
+        return f'loaded {batch}'
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, load)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+
+    # a batch parameter doesn't enter batch mode
+    monkeypatch.setattr(sys, "argv", ["test", "load", "foo"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert capsys.readouterr().out == "loaded foo\n"
+
+
+def test_cli_batch_jobs_param_names(capsys, monkeypatch, tmp_path):
+    import json
+
+    def plan(jobs: int = 1, ordered: str = 'no'):
+        '''this is a test function'''
+        return [jobs, ordered]
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, plan)
+
+    cli_obj = cli_handler.CLI("description")
+    cli_obj.add_funcs(stakk.get_stack(stack_id))
+
+    # parameters named like the batch options only reach the command
+    monkeypatch.setattr(sys, "argv", ["test", "plan", "--jobs", "8"])
+    with pytest.raises(SystemExit):
+        cli_obj.parse()
+    assert capsys.readouterr().out == "[8, 'no']\n"
+
+    batch = tmp_path / 'commands.txt'
+    batch.write_text('\n'.join(f'plan --jobs {i} --ordered yes' for i in range(20)))
+    monkeypatch.setattr(sys, "argv", ["test", "--batch", str(batch), "--jobs", "4", "--ordered", "plan"])
+    with pytest.raises(SystemExit) as exit_info:
+        cli_obj.parse()
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert exit_info.value.code == 0
+    assert [record['result'] for record in records] == [[i, 'yes'] for i in range(20)]
+    assert cli_obj.input._stakk_jobs == 4 and cli_obj.input._stakk_ordered
@@ -0,0 +1,116 @@
+import csv, json, os
+from stakk import bench_handler, export_handler
+
+### Tests
+
+def run_calls(benchy, calls=10):
+    @benchy
+    def func_export(x: int) -> int:
+        """this is a test function"""
+        return x
+
+    for i in range(calls):
+        func_export(i)
+
+
+def test_export_jsonl(tmp_path):
+    path = str(tmp_path / 'records.jsonl')
+    benchy = bench_handler.Benchy()
+    exporter = benchy.stream(path, flush_interval=0.01)
+    run_calls(benchy)
+    benchy.unstream(exporter)
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 10
+    assert records[0]['function'] == 'func_export'
+    assert records[3]['args'] == [{'type': 'int', 'value': 3}]
+    assert 'benchmark' in records[0] and 'time' in records[0]
+
+
+def test_export_csv(tmp_path):
+    path = str(tmp_path / 'records.csv')
+    benchy = bench_handler.Benchy()
+    exporter = benchy.stream(path, fmt='csv')
+    run_calls(benchy)
+    benchy.unstream(exporter)
+
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 10
+    assert rows[0]['function'] == 'func_export'
+    assert json.loads(rows[1]['result']) == {'type': 'int', 'value': 1}
+
+
+def test_export_binary_rotation(tmp_path):
+    path = str(tmp_path / 'records.bin')
+    benchy = bench_handler.Benchy()
+    exporter = benchy.stream(path, fmt='binary', max_bytes=1, backups=2)
+
+    # drain batches manually to force one rotation per batch
+    exporter._stop.set()
+    exporter._thread.join()
+    for _ in range(3):
+        run_calls(benchy, 5)
+        exporter.drain()
+    exporter._stop.clear()
+    benchy.unstream(exporter)
+
+    assert os.path.exists(path + '.1') and os.path.exists(path + '.2')
+    assert not os.path.exists(path + '.3')
+    records = list(export_handler.read_binary(path + '.1'))
+    assert len(records) == 5
+    assert records[0]['function'] == 'func_export'
+
+
+def test_read_binary_truncated(tmp_path):
+    path = str(tmp_path / 'records.bin')
+    exporter = export_handler.Exporter(path, fmt='binary')
+    exporter.put('func', {'benchmark': 0.1})
+    exporter.put('func', {'benchmark': 0.2})
+    exporter.close()
+
+    # simulate a crash mid write
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 2)
+
+    assert [record['benchmark'] for record in export_handler.read_binary(path)] == [0.1]
+
+
+def test_export_timing_while_running(tmp_path):
+    path = str(tmp_path / 'records.jsonl')
+    benchy = bench_handler.Benchy()
+    exporter = benchy.stream(path, flush_interval=0.01)
+
+    @benchy(level='timing')
+    def timed(x):
+        return x
+
+    @benchy(tail=0.0)
+    def tailed(x):
+        return x
+
+    @benchy(level='timing', sample=2)
+    def sampled(x):
+        return x
+
+    for i in range(10):
+        timed(i)
+        tailed(i)
+        sampled(i)
+
+    # written by the exporter thread without reading the report
+    exporter._stop.set()
+    exporter._thread.join()
+    exporter.drain()
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    functions = [record['function'] for record in records]
+    assert (functions.count('timed'), functions.count('tailed'), functions.count('sampled')) == (10, 10, 5)
+    benchy.unstream(exporter)
+
+    # merging the buffers doesn't write them again
+    assert len(benchy.report['timed']) == 10
+    exporter.drain()
+    with open(path) as f:
+        assert len(f.readlines()) == 25
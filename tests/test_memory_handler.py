@@ -0,0 +1,61 @@
+import gc, tracemalloc
+from stakk import memory_handler
+
+### Tests
+
+def test_memory_probe():
+    probe = memory_handler.MemoryProbe()
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        state = probe.start()
+        data = [bytearray(1000) for _ in range(100)]
+        gc.collect()
+        measured = probe.stop(state)
+    finally:
+        probe.gc_monitor.uninstall()
+        if not was_tracing:
+            tracemalloc.stop()
+
+    assert measured['memory']['net'] >= 100 * 1000
+    assert measured['memory']['peak'] >= measured['memory']['net']
+    assert measured['gc']['collections'][2] >= 1
+    assert measured['gc']['time'] >= 0
+    assert len(data) == 100
+
+
+def test_memory_probe_nested():
+    probe = memory_handler.MemoryProbe()
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        outer = probe.start()
+        data = bytearray(2 * 1000 * 1000)
+        del data
+
+        # the inner call resets the process wide peak
+        inner = probe.start()
+        small = bytearray(1000)
+        inner_measured = probe.stop(inner)
+        outer_measured = probe.stop(outer)
+    finally:
+        probe.gc_monitor.uninstall()
+        if not was_tracing:
+            tracemalloc.stop()
+
+    assert outer_measured['memory']['peak'] >= 2 * 1000 * 1000
+    assert inner_measured['memory']['peak'] < 1000 * 1000
+    assert probe.active == {}
+    assert len(small) == 1000
+
+
+def test_gc_monitor():
+    monitor = memory_handler.GCMonitor()
+    monitor.install()
+    monitor.install()
+    try:
+        assert gc.callbacks.count(monitor) == 1
+        gc.collect(0)
+    finally:
+        monitor.uninstall()
+
+    assert monitor.collections[0] >= 1
+    assert monitor not in gc.callbacks
@@ -0,0 +1,111 @@
+import urllib.request
+import pytest
+from stakk import bench_handler, metrics_handler
+
+### Tests
+
+def test_metrics_render():
+    benchy = bench_handler.Benchy()
+    metrics = benchy.expose(buckets=(0.001, 1.0))
+
+    @benchy(level='timing')
+    def fast():
+        pass
+
+    @benchy(level='timing', sample=2)
+    def sampled():
+        pass
+
+    @benchy
+    def fails():
+        raise ValueError('boom')
+
+    for _ in range(3):
+        fast()
+    for _ in range(10):
+        sampled()
+    with pytest.raises(ValueError):
+        fails()
+
+    text = metrics.render()
+    assert 'stakk_call_duration_seconds_bucket{function="fast",le="1.0"} 3' in text
+    assert 'stakk_call_duration_seconds_bucket{function="fast",le="+Inf"} 3' in text
+    assert 'stakk_calls_total{function="fast"} 3' in text
+    assert 'stakk_calls_total{function="sampled"} 10' in text
+    assert 'stakk_errors_total{function="fails"} 1' in text
+    assert 'stakk_calls_total{function="fails"} 0' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_metrics_http():
+    benchy = bench_handler.Benchy()
+    metrics = benchy.expose(port=0)
+
+    @benchy(aggregate=True)
+    def work():
+        pass
+
+    work()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{metrics.port}/metrics') as response:
+            assert response.headers['Content-Type'] == metrics_handler.CONTENT_TYPE
+            assert 'stakk_calls_total{function="work"} 1' in response.read().decode()
+    finally:
+        benchy.unexpose(metrics)
+
+
+def test_metrics_textfile(tmp_path):
+    benchy = bench_handler.Benchy()
+    path = tmp_path / 'stakk.prom'
+    metrics = benchy.expose(path=str(path), interval=60)
+
+    @benchy
+    def work():
+        pass
+
+    work()
+    metrics.write(str(path))
+    benchy.unexpose(metrics)
+    assert 'stakk_calls_total{function="work"} 1' in path.read_text()
+
+
+def test_escape():
+    assert metrics_handler.escape('a"b\\c\n') == 'a\\"b\\\\c\\n'
+
+
+def test_metrics_unscraped():
+    benchy = bench_handler.Benchy()
+    metrics = benchy.expose(buckets=(1.0,))
+
+    @benchy(aggregate=True)
+    def work():
+        pass
+
+    # records are folded into the histograms on the call, nothing queues up unscraped
+    for _ in range(1000):
+        work()
+    assert metrics.histograms['work'][:2] == [1000, 0]
+    assert 'stakk_calls_total{function="work"} 1000' in metrics.render()
+
+
+def test_metrics_counting_window():
+    benchy = bench_handler.Benchy()
+
+    @benchy
+    def fails():
+        raise ValueError('boom')
+
+    # errors before expose aren't counted, like calls
+    with pytest.raises(ValueError):
+        fails()
+    metrics = benchy.expose()
+    with pytest.raises(ValueError):
+        fails()
+    assert 'stakk_errors_total{function="fails"} 1' in metrics.render()
+
+    # a closed metrics object stops recording
+    metrics.close()
+    assert metrics not in benchy.sinks
+    with pytest.raises(ValueError):
+        fails()
+    assert 'stakk_errors_total{function="fails"} 1' in metrics.render()
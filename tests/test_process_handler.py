@@ -0,0 +1,112 @@
+import queue
+import multiprocessing
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from stakk import bench_handler, process_handler
+
+benchy = bench_handler.Benchy()
+
+@benchy(aggregate=True)
+def square(x):
+    return x * x
+
+@benchy(level='timing', aggregate=True)
+def work(x):
+    return x
+
+@benchy(aggregate=True)
+def work_full(x):
+    return x
+
+def init_worker(channel):
+    benchy.publish(channel, interval=0.01)
+
+### Tests
+
+def test_receive_empty():
+    assert process_handler.receive(queue.Queue()) == []
+
+
+def test_publisher_deltas():
+    local = bench_handler.Benchy()
+    channel = queue.Queue()
+
+    @local(aggregate=True)
+    def work():
+        pass
+
+    publisher = local.publish(channel, interval=60)
+    for _ in range(5):
+        work()
+    publisher.close()
+
+    pid, deltas = channel.get_nowait()
+    assert deltas['work'].count == 5
+
+    # nothing new to publish after a delta was taken
+    assert local.take_deltas() == {}
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='requires fork')
+def test_worker_aggregation():
+    context = multiprocessing.get_context('fork')
+    channel = benchy.collect(context)
+
+    with ProcessPoolExecutor(2, mp_context=context, initializer=init_worker, initargs=(channel,)) as pool:
+        assert sum(pool.map(square, range(100))) == sum(x * x for x in range(100))
+
+    report = benchy.report
+    assert report['square'].count == 100
+    assert sum(worker['square'].count for worker in benchy.workers.values()) == 100
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='requires fork')
+def test_worker_aggregation_after_parent_records():
+    context = multiprocessing.get_context('fork')
+    channel = benchy.collect(context)
+
+    # the forked workers inherit a thread buffer holding the parent records
+    work(0)
+    work_full(0)
+    with ProcessPoolExecutor(2, mp_context=context, initializer=init_worker, initargs=(channel,)) as pool:
+        assert list(pool.map(work, range(100))) == list(range(100))
+        assert list(pool.map(work_full, range(100))) == list(range(100))
+
+    report = benchy.report
+    assert report['work'].count == 101
+    assert report['work_full'].count == 101
+    assert sum(worker['work'].count for worker in benchy.workers.values() if 'work' in worker) == 100
+
+
+def test_receive_record_functions():
+    local = bench_handler.Benchy()
+    channel = local.collect(queue)
+
+    @local(aggregate=True)
+    def aggregated():
+        pass
+
+    @local
+    def kept():
+        pass
+
+    deltas = {}
+    for name in ('aggregated', 'kept'):
+        deltas[name] = bench_handler.Stats()
+        deltas[name].add(0.1)
+
+    # worker deltas arrive before the parent calls the functions
+    channel.put((1, deltas))
+    report = local.report
+    assert report['aggregated'].count == 1
+    assert 'kept' not in report
+    assert local.workers[1]['kept'].count == 1
+
+    # and after, records kept in the parent are never replaced or mixed with worker data
+    aggregated()
+    kept()
+    channel.put((2, deltas))
+    report = local.report
+    assert report['aggregated'].count == 3
+    assert isinstance(report['kept'], list) and len(report['kept']) == 1
+    assert local.workers[2]['kept'].count == 1
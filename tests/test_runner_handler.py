@@ -0,0 +1,68 @@
+import asyncio
+from stakk import runner_handler, meta_handler
+
+### Tests
+
+def test_runner_run():
+    def add(x: int, y: int = 1) -> int:
+        '''this is a test function'''
+        return x + y
+
+    async def delay():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    stakk = meta_handler.Stack()
+    stack_id = 'test'
+    stakk.add_func(stack_id, add)
+    stakk.add_func(stack_id, delay)
+
+    runner = runner_handler.Runner(warmup=1, rounds=5, min_time=0.001, disable_gc=True)
+    results = runner.run(stakk.get_stack(stack_id), {'add': [(1, 2), {'x': 3}]})
+
+    assert set(results) == {'add[0]', 'add[1]', 'delay'}
+    for result in results.values():
+        assert result['rounds'] == 5
+        assert result['loops'] >= 1
+        assert result['min'] <= result['median'] <= result['max']
+        assert result['ci'][0] <= result['mean'] <= result['ci'][1]
+        assert 0 <= result['outliers'] <= 5
+
+    # the event loop is closed after the run
+    assert runner.loop is None
+
+    # a single argument set doesn't need a list
+    for arg_set in ((1, 2), {'x': 1, 'y': 2}):
+        assert set(runner.run({'add': stakk.get_stack(stack_id)['add']}, {'add': arg_set})) == {'add'}
+
+
+def test_runner_calibrate():
+    runner = runner_handler.Runner(min_time=0.01)
+
+    # a round of n loops takes n milliseconds
+    assert runner.calibrate(lambda loops: loops * 0.001) == 10
+
+
+def test_runner_stats():
+    runner = runner_handler.Runner()
+    result = runner.summarize([1.0, 1.0, 1.0, 1.0, 10.0], 1)
+    assert result['outliers'] == 1
+    assert result['median'] == 1.0
+
+    # t quantiles close to tabled values
+    assert abs(runner.t_value(0.95, 10) - 2.228) < 0.01
+    assert abs(runner.t_value(0.95, 1000) - 1.962) < 0.01
+
+
+def test_runner_latency():
+    async def delay():
+        '''this is a test async function'''
+        await asyncio.sleep(0)
+
+    runner = runner_handler.Runner(warmup=2)
+    for func in (abs, delay):
+        args = (-1,) if func is abs else ()
+        result = runner.latency(func, 100, args)
+        assert result['runs'] == 100 and result['warmup'] == 2
+        assert result['min'] <= result['p50'] <= result['p90'] <= result['p99'] <= result['max']
+        assert result['throughput'] > 0
@@ -0,0 +1,62 @@
+import time, threading
+import pytest
+from stakk import sample_handler
+
+### Tests
+
+def test_sampler_fixed():
+    sampler = sample_handler.Sampler(10)
+    weights = [sampler.take() for _ in range(100)]
+
+    assert weights.count(10) == 10
+    assert sum(weights) == 100
+    assert sampler.calls == 100
+
+
+def test_sampler_probabilistic():
+    sampler = sample_handler.Sampler(0.25)
+    weights = [sampler.take() for _ in range(10000)]
+
+    assert set(weights) == {0, 4}
+    assert 8000 < sum(weights) < 12000
+    assert sampler.calls == 10000
+
+
+def test_sampler_adaptive():
+    sampler = sample_handler.Sampler('adaptive', budget=100, window=0.01)
+    assert sampler.every == 1
+
+    # call far above the budget until the window adjusts the interval
+    end = time.monotonic() + 0.05
+    while time.monotonic() < end:
+        sampler.take()
+    assert sampler.every > 1
+
+    # slow calls after the burst bring the interval back down
+    weights = []
+    for _ in range(20):
+        time.sleep(0.02)
+        weights.append(sampler.take())
+    assert sampler.every == 1
+    assert any(weights)
+
+
+def test_sampler_invalid():
+    for policy in (0, -1, 1.5, 'sometimes', True):
+        with pytest.raises(ValueError):
+            sample_handler.Sampler(policy)
+
+
+def test_sampler_calls_threads():
+    sampler = sample_handler.Sampler(3)
+
+    def run():
+        for _ in range(1000):
+            sampler.take()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sampler.calls == 4000
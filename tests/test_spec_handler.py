@@ -0,0 +1,148 @@
+import os, sys, importlib.util
+import pytest
+from stakk import spec_handler, meta_handler, cli_handler
+
+SOURCE = '''
+class Custom:
+    pass
+
+def build(name: str, mode: ['fast', 'slow'] = 'fast', tags: list = None, count: int = 1) -> str:
+    """build a report"""
+    return name
+
+def custom(value: Custom):
+    """takes a custom type"""
+    return value
+'''
+
+#### FIXTURES
+
+@pytest.fixture
+def module(tmp_path):
+    path = tmp_path / 'commands.py'
+    path.write_text(SOURCE)
+    spec = importlib.util.spec_from_file_location('commands', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+### Tests
+
+def test_spec_round_trip(module):
+    stakk = meta_handler.Stack()
+    func_meta = stakk.introspect('ops', module.build)
+
+    spec = spec_handler.to_spec(func_meta, 'build()')
+    assert spec['types']['mode'] == {'choices': ['fast', 'slow'], 'container': 'list'}
+    assert spec_handler.from_spec(spec, module.build, 'ops') == func_meta
+
+    # custom callables are not cached
+    assert spec_handler.to_spec(stakk.introspect('ops', module.custom)) is None
+
+
+def test_spec_cache(module, tmp_path, monkeypatch):
+    path = str(tmp_path / '.cli.stakk.json')
+    stakk = meta_handler.Stack()
+    stakk.specs = spec_handler.SpecCache(path)
+    stakk.add_func('ops', module.build)
+    stakk.add_func('ops', module.custom)
+    expected = stakk.get_stack('ops')
+    stakk.specs.save()
+
+    # a fresh run builds cacheable commands without introspection
+    introspect = meta_handler.Stack.introspect
+    introspected = []
+    monkeypatch.setattr(meta_handler.Stack, 'introspect',
+                        lambda self, stack, func: introspected.append(func.__name__) or introspect(self, stack, func))
+    stakk = meta_handler.Stack()
+    stakk.specs = spec_handler.SpecCache(path)
+    stakk.add_func('ops', module.build)
+    stakk.add_func('ops', module.custom)
+    assert stakk.get_stack('ops') == expected
+    assert introspected == ['custom']
+
+    # the command help comes from the cache too
+    monkeypatch.setattr(cli_handler.CLI, 'describe', lambda *args: pytest.fail('describe called'))
+    cli_obj = cli_handler.CLI('description')
+    cli_obj.specs = stakk.specs
+    cli_obj.add_funcs(stakk.get_stack('ops'))
+    help_text = cli_obj.subparsers.choices['build'].format_help()
+    assert "build(name: str, mode: choice_type = 'fast'" in help_text
+
+    # editing the source invalidates its entries
+    stat = os.stat(module.__file__)
+    os.utime(module.__file__, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert spec_handler.SpecCache(path).get('ops', 'build') is None
+
+
+def test_spec_cache_version(tmp_path):
+    path = tmp_path / '.cli.stakk.json'
+    path.write_text('{"stakk": "0.0.0", "commands": {"ops:build": {}}}')
+    assert spec_handler.SpecCache(str(path)).entries == {}
+
+    path.write_text('not json')
+    assert spec_handler.SpecCache(str(path)).entries == {}
+
+
+LAZY_SOURCE = '''
+import asyncio
+
+def build(name: str, mode: ['fast', 'slow'] = 'fast', count: int = 1) -> str:
+    """build a report
+
+    extended description
+    """
+    return f'{name} {mode} {count}'
+
+async def fetch(*args, **kwargs):
+    """fetch things"""
+    await asyncio.sleep(0)
+    return 'fetched'
+
+def custom(value: asyncio.Future):
+    """annotated with a type the source can't answer"""
+'''
+
+
+def test_lazy_func(tmp_path, monkeypatch, capsys):
+    package = tmp_path / 'lazypkg'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'reports.py').write_text(LAZY_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'lazypkg.reports', raising=False)
+
+    stakk = meta_handler.Stack()
+    for name in ('build', 'fetch'):
+        stakk.add_func('ops', spec_handler.LazyFunc(f'lazypkg.reports:{name}'))
+
+    # signature and help come from the source
+    cli_obj = cli_handler.CLI('description')
+    cli_obj.add_funcs(stakk.get_stack('ops'))
+    assert "build(name: str, mode: choice_type = 'fast', count: int = 1) -> str" in \
+        cli_obj.subparsers.choices['build'].format_help()
+    assert 'lazypkg.reports' not in sys.modules and 'lazypkg' not in sys.modules
+
+    # the module is imported when the command runs
+    monkeypatch.setattr(sys, 'exit', lambda *args: None)
+    monkeypatch.setattr(sys, 'argv', ['test', 'build', 'x', '--count', '2'])
+    cli_obj.parse()
+    assert 'x fast 2' in capsys.readouterr().out
+    assert 'lazypkg.reports' in sys.modules
+
+    monkeypatch.setattr(sys, 'argv', ['test', 'fetch'])
+    cli_obj.parse()
+    assert 'fetched' in capsys.readouterr().out
+
+    # metadata matches introspection of the imported functions
+    module = sys.modules['lazypkg.reports']
+    for name in ('build', 'fetch'):
+        lazy_meta = dict(stakk.get_stack('ops')[name], func=None)
+        assert lazy_meta == dict(stakk.introspect('ops', getattr(module, name)), func=None)
+
+    # annotations the source can't answer fall back to importing
+    lazy = spec_handler.LazyFunc('lazypkg.reports:custom')
+    assert stakk.introspect('ops', lazy)['types']['value'] is module.asyncio.Future
+
+    with pytest.raises(ValueError):
+        spec_handler.LazyFunc('lazypkg.reports.build')
@@ -105,4 +105,18 @@ def test_cli(monkeypatch):
 
         stakk.cli(stack_id)
 
-    assert stakk.stack.cli is not None
\ No newline at end of file
+    assert stakk.stack.cli is not None
+
+# Test 4: this should test the benchmark runner from stakk
+def test_bench():
+    stack_id = 'test_bench'
+
+    @stakk.register(stack_id)
+    def func_test(x: int, y: int) -> int:
+        """this is a test function"""
+        return x + y
+
+    results = stakk.bench(stack_id, {'func_test': [(1, 2)]}, rounds=3, min_time=0.001)
+
+    assert results['func_test']['rounds'] == 3
+    assert results['func_test']['mean'] > 0
@@ -0,0 +1,46 @@
+import statistics, random
+from stakk import stats_handler
+
+### Tests
+
+def test_stats_summary():
+    values = [random.uniform(0.001, 0.1) for _ in range(1000)]
+    stats = stats_handler.Stats()
+    for value in values:
+        stats.add(value)
+
+    summary = stats.summary()
+    assert summary['count'] == len(values)
+    assert abs(summary['mean'] - statistics.mean(values)) < 1e-9
+    assert abs(summary['stdev'] - statistics.stdev(values)) < 1e-9
+    assert summary['min'] == min(values)
+    assert summary['max'] == max(values)
+
+    # quantiles are within the sketch relative accuracy
+    median = statistics.median(values)
+    assert abs(summary['p50'] - median) / median < 0.05
+
+
+def test_stats_merge():
+    left, right, combined = stats_handler.Stats(), stats_handler.Stats(), stats_handler.Stats()
+    for i in range(1, 500):
+        left.add(i * 0.001)
+        combined.add(i * 0.001)
+    for i in range(500, 1000):
+        right.add(i * 0.001)
+        combined.add(i * 0.001)
+
+    left.merge(right)
+    assert left.count == combined.count
+    assert abs(left.mean - combined.mean) < 1e-9
+    assert abs(left.variance - combined.variance) < 1e-9
+    assert left.sketch.quantile(0.9) == combined.sketch.quantile(0.9)
+
+
+def test_sketch_bounded():
+    sketch = stats_handler.Sketch(max_buckets=50)
+    for i in range(1, 10000):
+        sketch.add(i * 1e-6)
+
+    assert len(sketch.buckets) <= 50
+    assert sketch.count == 9999
@@ -0,0 +1,106 @@
+import pytest
+from stakk import store_handler
+
+### Tests
+
+def test_ring():
+    ring = store_handler.Ring(3)
+    assert list(ring) == []
+
+    for i in range(5):
+        ring.append(i)
+
+    # only the most recent records are kept in call order
+    assert list(ring) == [2, 3, 4]
+    assert len(ring) == 3
+    assert ring[-1] == 4
+    assert ring.seen == 5
+
+    with pytest.raises(ValueError):
+        store_handler.Ring(0)
+
+
+def test_reservoir():
+    reservoir = store_handler.Reservoir(100, seed=1)
+    for i in range(10000):
+        reservoir.append(i)
+
+    sample = list(reservoir)
+    assert len(sample) == 100
+    assert len(set(sample)) == 100
+    assert reservoir.seen == 10000
+
+    # sample is spread across the whole history
+    assert min(sample) < 2500 and max(sample) > 7500
+
+
+def test_columns():
+    columns = store_handler.Columns()
+    columns.append({'benchmark': 0.5, 'args': [{'type': 'int', 'value': 1}],
+                    'kwargs': None, 'result': {'type': 'list', 'length': 3}})
+    columns.append({'benchmark': 0.25, 'args': None,
+                    'kwargs': {'key': {'type': 'str', 'length': 2}}, 'result': {'type': 'int', 'value': 4}})
+
+    assert len(columns) == 2
+    assert list(columns['benchmark']) == [0.5, 0.25]
+    assert list(columns['seq']) == [0, 1]
+    assert [columns.types[i] for i in columns['result.type']] == ['list', 'int']
+    assert list(columns['result.length']) == [3, -1]
+
+    # columns created mid stream are backfilled
+    assert list(columns['arg0.value'])[0] == 1
+    assert list(columns['kwarg.key.length']) == [-1, 2]
+    assert all(len(column) == 2 for column in columns.columns.values())
+
+
+def test_columns_numpy():
+    np = pytest.importorskip('numpy')
+    columns = store_handler.Columns()
+    for i in range(100):
+        columns.append({'benchmark': float(i), 'result': {'type': 'int', 'value': i}})
+
+    arrays = columns.to_numpy()
+    assert arrays['benchmark'].dtype == np.float64
+    assert np.percentile(arrays['benchmark'], 50) == 49.5
+
+    # exported arrays share memory with the store
+    assert np.shares_memory(arrays['benchmark'], np.frombuffer(columns['benchmark']))
+
+    # appending while a view is alive keeps the view as a snapshot
+    columns.append({'benchmark': 100.0, 'result': {'type': 'int', 'value': 100}})
+    assert len(arrays['benchmark']) == 100
+    assert len(columns['benchmark']) == 101
+
+
+def test_columns_dataframe():
+    pytest.importorskip('pandas')
+    columns = store_handler.Columns()
+    columns.append({'benchmark': 0.5, 'result': {'type': 'int', 'value': 1}})
+
+    frame = columns.to_dataframe()
+    assert list(frame['result.type']) == ['int']
+    assert frame['benchmark'].iloc[0] == 0.5
+
+
+def test_tail_fixed():
+    tail = store_handler.Tail(0.5, slowest=3)
+    for benchmark in (0.1, 0.6, 0.9, 0.7, 0.2, 0.8):
+        if tail.observe(benchmark):
+            tail.capture({'benchmark': benchmark})
+
+    # bounded heap of the slowest calls, slowest first
+    assert [record['benchmark'] for record in tail.records()] == [0.9, 0.8, 0.7]
+
+
+def test_tail_quantile():
+    tail = store_handler.Tail('p90', warmup=100, refresh=100)
+    captured = [i / 1000 for i in range(1, 1001) if tail.observe(i / 1000)]
+
+    # nothing is captured during warmup, then roughly the slowest 10%
+    assert captured[0] >= 0.1
+    assert 0.85 < tail.threshold < 1.0
+
+    with pytest.raises(ValueError):
+        store_handler.Tail('fast')
+    with pytest.raises(ValueError):
+        store_handler.Tail(0.1, slowest=0)
@@ -0,0 +1,82 @@
+import pytest
+from stakk import bench_handler, summary_handler
+
+### Tests
+
+def test_summarizers_builtin():
+    summarize = summary_handler.Summarizers().summarize
+
+    assert summarize([1, 2, 3]) == {'type': 'list', 'length': 3}
+    assert summarize(2.5) == {'type': 'float', 'value': 2.5}
+    assert summarize(x for x in ()) == {'type': 'generator'}
+    assert summarize(memoryview(bytes(12)).cast('i')) == {
+        'type': 'memoryview', 'length': 3, 'shape': [3], 'dtype': 'i', 'nbytes': 12}
+
+
+def test_benchy_summarize_static():
+    # the static default stays available on the class, instances use their own registry
+    benchy = bench_handler.Benchy()
+    benchy.summarizers.register(int, lambda data: {'type': 'custom'})
+
+    assert bench_handler.Benchy.summarize([1, 2]) == {'type': 'list', 'length': 2}
+    assert bench_handler.Benchy.summarize(3) == {'type': 'int', 'value': 3}
+    assert benchy.summarize(3) == {'type': 'custom'}
+
+
+def test_summarizers_register():
+    summarizers = summary_handler.Summarizers()
+
+    class Lazy:
+        def __iter__(self):
+            return iter(())
+
+        def __len__(self):
+            raise AssertionError('length must not be computed')
+
+    class LazySub(Lazy):
+        pass
+
+    @summarizers.register(Lazy)
+    def lazy(data):
+        return {'type': type(data).__name__}
+
+    # subclasses resolve along the mro and are cached per type
+    assert summarizers.summarize(LazySub()) == {'type': 'LazySub'}
+    assert summarizers._cache[LazySub] is lazy
+
+    summarizers.register(f'{__name__}.{LazySub.__qualname__}', summary_handler.default)
+    assert summarizers._cache == {}
+
+
+def test_summarizers_numpy():
+    np = pytest.importorskip('numpy')
+    summarize = summary_handler.Summarizers().summarize
+
+    assert summarize(np.zeros((4, 2), dtype='float32')) == {
+        'type': 'ndarray', 'length': 4, 'shape': [4, 2], 'dtype': 'float32', 'nbytes': 32}
+    assert summarize(np.int64(7)) == {'type': 'int64', 'value': 7}
+
+
+def test_summarizers_pandas():
+    pd = pytest.importorskip('pandas')
+    summarize = summary_handler.Summarizers().summarize
+    frame = pd.DataFrame({'a': range(5), 'b': range(5)})
+
+    assert summarize(frame) == {'type': 'DataFrame', 'length': 5, 'shape': [5, 2],
+                                'dtypes': {'a': 'int64', 'b': 'int64'},
+                                'nbytes': int(frame.memory_usage(deep=False).sum())}
+    assert summarize(frame['a'])['dtype'] == 'int64'
+
+
+def test_summarizers_benchy():
+    np = pytest.importorskip('numpy')
+    benchy = bench_handler.Benchy()
+
+    @benchy(columnar=True)
+    def func_array(data):
+        """this is a test function"""
+        return data.sum()
+
+    func_array(np.ones(100))
+    assert benchy.report['func_array']['arg0.nbytes'][0] == 800
+    assert benchy.report['func_array']['result.value'][0] == 100.0